@@ -9,6 +9,11 @@ HTML body content (cleaned up) and copies images alongside.
 Usage:
     python3 scripts/add_images.py [OPTIONS]
 
+When LibreOffice's Python bindings (``uno``) are importable, one long-lived
+headless LO daemon is started per worker and driven over a UNO socket, so the
+soffice startup cost is paid once per worker rather than once per document.
+Otherwise each document is converted with a one-shot ``soffice`` process.
+
 Options:
     --workers N      Parallel LO instances (default: 4)
     --theme THEME    Process only one theme (e.g. "02-family-chronicle")
@@ -20,22 +25,64 @@ import argparse
 import concurrent.futures
 import html.parser
 import json
+import mmap
+import multiprocessing
 import os
 import re
 import shutil
+import signal
 import subprocess
 import sys
 import tempfile
+import threading
 import time
 import urllib.parse
 from pathlib import Path
 
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+    from com.sun.star.uno import RuntimeException as UnoRuntimeException
+except ImportError:
+    # LibreOffice's Python bindings aren't importable; fall back to the CLI
+    uno = None
+
 ARCHIVE_ROOT = Path(__file__).resolve().parent.parent
 TIMEOUT_SECONDS = 60
+LO_BASE_PORT = 2002
+
+CONVERTIBLE_EXTENSIONS = frozenset({'.doc', '.docx', '.rtf', '.odt'})
+IMAGE_EXTENSIONS = frozenset({
+    '.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.tif', '.svg', '.wmf', '.emf',
+})
 
 
 # ─── HTML Cleaning ───────────────────────────────────────────────────────────
 
+_FONT_TAG_RE = re.compile(r'</?font\b[^>]*>', re.IGNORECASE)
+# class="western"/"cjk"/"ctl" attributes, or a whole style attribute (group 1)
+_CLASS_OR_STYLE_RE = re.compile(r'\s+class="(?:western|cjk|ctl)"|\s+style="([^"]*)"')
+_FONTSIZE_RE = re.compile(r'font-size\s*:\s*[^;"}]+;?\s*')
+_COLCOUNT_RE = re.compile(r'<div[^>]*column-count[^>]*>', re.IGNORECASE)
+_IMG_RE = re.compile(r'<img\s+([^>]*?)/?>', re.IGNORECASE)
+_SRC_RE = re.compile(r'src="([^"]*)"')
+_IMG_STRIP_ATTRS_RE = re.compile(r'\s+(?:width|height|border|name)="[^"]*"')
+_BODY_OPEN_RE = re.compile(rb'<body[^>]*>', re.IGNORECASE)
+BODY_TAIL_BYTES = 4096  # LO's </body> sits within this much of the end
+
+
+def _clean_class_or_style(m):
+    """Drop LO class attributes; strip font-size from styles, dropping them if empty."""
+    style = m.group(1)
+    if style is None:
+        return ''
+    style = _FONTSIZE_RE.sub('', style)
+    if not style.strip():
+        return ''
+    return m.group(0)[:m.start(1) - m.start(0)] + style + '"'
+
+
 class TagStripper(html.parser.HTMLParser):
     """Strip specified tags but keep their content."""
 
@@ -100,21 +147,17 @@ def clean_lo_html(body_html, image_files, reader_slug):
     - Strip width/height/border/name from <img> tags, rewrite src paths
     - Sequential image naming: img001.png, img002.png, ...
     """
-    # Strip <font> tags
-    result = strip_tags(body_html, ['font'])
-
-    # Remove class="western", class="cjk", class="ctl"
-    result = re.sub(r'\s+class="(western|cjk|ctl)"', '', result)
-
-    # Strip font-size from style attributes
-    result = re.sub(r'font-size\s*:\s*[^;"}]+;?\s*', '', result)
+    # Strip <font> tags (only ever this one tag, so a single regex pass
+    # instead of the general-purpose TagStripper)
+    result = _FONT_TAG_RE.sub('', body_html)
 
-    # Remove empty style attributes left over
-    result = re.sub(r'\s+style="\s*"', '', result)
+    # Remove class="western"/"cjk"/"ctl", strip font-size from style
+    # attributes and drop any style left empty — all in one pass
+    result = _CLASS_OR_STYLE_RE.sub(_clean_class_or_style, result)
 
     # Remove column-count divs (unwrap them)
     # Match <div ...column-count...> and </div> that wraps everything
-    result = re.sub(r'<div[^>]*column-count[^>]*>', '', result, flags=re.IGNORECASE)
+    result = _COLCOUNT_RE.sub('', result)
     # We can't perfectly match closing divs, but LO column-count divs typically
     # wrap the whole body. We'll remove the corresponding closing tags carefully.
     # Instead, let's just remove all div tags that have column-count in their style
@@ -128,45 +171,67 @@ def clean_lo_html(body_html, image_files, reader_slug):
         new_name = f'img{i:03d}{ext}'
         img_map[orig_name] = new_name
 
-    # Rewrite <img> tags
-    def rewrite_img(m):
+    # Rewrite <img> tags in a single walk, copying the text between them
+    out = []
+    pos = 0
+    for m in _IMG_RE.finditer(result):
         tag_content = m.group(1)
         # Extract src
-        src_match = re.search(r'src="([^"]*)"', tag_content)
+        src_match = _SRC_RE.search(tag_content)
         if not src_match:
-            return m.group(0)
+            continue
 
         src_basename = os.path.basename(urllib.parse.unquote(src_match.group(1)))
 
         if src_basename not in img_map:
             # Image not in our map - might be a data URI or external, keep as is
-            return m.group(0)
+            continue
 
         new_src = f'img/{reader_slug}/{img_map[src_basename]}'
 
-        # Strip width, height, border, name attributes
-        cleaned = re.sub(r'\s+(width|height|border|name)="[^"]*"', '', tag_content)
-        # Replace src
-        cleaned = re.sub(r'src="[^"]*"', f'src="{new_src}"', cleaned)
+        # Replace src in place, then strip width, height, border, name attributes
+        cleaned = tag_content[:src_match.start(1)] + new_src + tag_content[src_match.end(1):]
+        cleaned = _IMG_STRIP_ATTRS_RE.sub('', cleaned)
 
-        return f'<img {cleaned.strip()}>'
+        out.append(result[pos:m.start()])
+        out.append(f'<img {cleaned.strip()}>')
+        pos = m.end()
 
-    result = re.sub(r'<img\s+([^>]*)/?>', rewrite_img, result, flags=re.IGNORECASE)
-
-    return result, img_map
+    out.append(result[pos:])
+    return ''.join(out), img_map
 
 
 def extract_lo_body(lo_html_path):
-    """Extract content between <body> and </body> from LO HTML output."""
-    content = lo_html_path.read_text(encoding='utf-8', errors='replace')
+    """Extract content between <body> and </body> from LO HTML output.
 
-    # Find body content
-    body_match = re.search(r'<body[^>]*>(.*?)</body>', content, re.DOTALL | re.IGNORECASE)
-    if body_match:
-        return body_match.group(1).strip()
+    The file is searched as raw bytes via mmap and only the body is decoded,
+    skipping LO's head section (inline CSS and the like).
+    """
+    with open(lo_html_path, 'rb') as f:
+        try:
+            content = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file
+            return ''
+
+    with content:
+        # Find body content (tag case varies between LO versions)
+        m_open = _BODY_OPEN_RE.search(content)
+        if m_open:
+            start = m_open.end()
+            # Find the last </body> in a lower-cased copy of just the tail
+            # (bytes.lower() only touches ASCII, so offsets are kept)
+            tail_start = max(start, len(content) - BODY_TAIL_BYTES)
+            end = content[tail_start:].lower().rfind(b'</body>')
+            if end != -1:
+                end += tail_start
+            else:
+                end = max(content.rfind(b'</body>', start), content.rfind(b'</BODY>', start))
+            if end != -1:
+                return content[start:end].decode('utf-8', errors='replace').strip()
 
-    # Fallback: return everything
-    return content
+        # Fallback: return everything
+        return content[:].decode('utf-8', errors='replace')
 
 
 # ─── Phase 1: Build source→reader mapping ────────────────────────────────────
@@ -174,7 +239,8 @@ def extract_lo_body(lo_html_path):
 def build_mapping(themes=None):
     """Scan reader pages, extract download links, build mapping.
 
-    Returns dict: (theme_dir, source_filename) → reader_html_path
+    Returns dict: (theme_dir, source_filename) → (reader_html_path, already_processed)
+    where already_processed is True if the page has the lo-images marker.
     """
     mapping = {}
 
@@ -200,16 +266,233 @@ def build_mapping(themes=None):
                 source_filename = urllib.parse.unquote(m.group(1))
                 source_path = theme_dir / 'files' / source_filename
                 if source_path.exists():
-                    mapping[(theme_dir.name, source_filename)] = reader_html
+                    already_processed = '<!-- lo-images -->' in content
+                    mapping[(theme_dir.name, source_filename)] = (reader_html, already_processed)
 
     return mapping
 
 
 # ─── Phase 2: LibreOffice conversion ─────────────────────────────────────────
 
+# Each worker process claims one LO slot (profile dir, daemon port) for its lifetime
+# and owns one conversion dir, emptied after every document. Images worth keeping
+# are moved from there into a staging dir shared by the whole run.
+_slot = None
+_desktop = None
+_daemon = None
+_daemon_pids = None
+_conv_dir = None
+_staging_dir = None
+
+STAGING_SUBDIR = 'images'
+
+
+def init_worker(slot_queue, work_root, daemon_pids):
+    """Process pool initializer: claim this worker's LO slot and conversion dir."""
+    global _slot, _daemon_pids, _conv_dir, _staging_dir
+    _slot = slot_queue.get()
+    _daemon_pids = daemon_pids
+    os.makedirs(profile_dir_for(_slot), exist_ok=True)
+    _conv_dir = os.path.join(work_root, f'worker{_slot}')
+    os.makedirs(_conv_dir, exist_ok=True)
+    _staging_dir = os.path.join(work_root, STAGING_SUBDIR)
+
+
+def worker_slot():
+    """Return the LO slot owned by the current worker process."""
+    return _slot
+
+
+def profile_dir_for(slot):
+    return f'/tmp/lo_profile_{slot}'
+
+
+def start_lo_daemon(slot):
+    """Start a headless LibreOffice instance for slot, listening for UNO connections.
+
+    It runs in a new session, so its process group (pgid == pid) also holds the
+    soffice.bin process the soffice wrapper spawns.
+    """
+    profile_dir = profile_dir_for(slot)
+    os.makedirs(profile_dir, exist_ok=True)
+    cmd = [
+        'soffice',
+        '--headless',
+        '--invisible',
+        '--norestore',
+        '--nologo',
+        '--nodefault',
+        f'-env:UserInstallation=file://{profile_dir}',
+        f'--accept=socket,host=127.0.0.1,port={LO_BASE_PORT + slot};urp;',
+    ]
+    return subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                            start_new_session=True)
+
+
+def start_lo_daemons(n, daemon_pids):
+    """Start N LO daemons, recording each slot's process group in daemon_pids."""
+    daemons = []
+    for slot in range(n):
+        proc = start_lo_daemon(slot)
+        daemon_pids[slot] = proc.pid
+        daemons.append(proc)
+    return daemons
+
+
+def kill_lo_daemon(pgid, sig=signal.SIGKILL):
+    """Signal a daemon's whole process group, ignoring one that has already gone."""
+    try:
+        os.killpg(pgid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def stop_lo_daemons(daemons, daemon_pids):
+    """Terminate every slot's LO daemon, including any a worker restarted."""
+    pgids = [pgid for pgid in daemon_pids if pgid]
+    for pgid in pgids:
+        kill_lo_daemon(pgid, signal.SIGTERM)
+    deadline = time.time() + 10
+    for proc in daemons:
+        try:
+            proc.wait(timeout=max(0, deadline - time.time()))
+        except subprocess.TimeoutExpired:
+            pass
+    # Restarted daemons aren't our children, and soffice.bin can outlive its
+    # wrapper — kill whatever is left in each group
+    for pgid in pgids:
+        kill_lo_daemon(pgid)
+
+
+def restart_lo_daemon():
+    """Kill this worker's LO daemon and start a fresh one in its slot."""
+    global _desktop, _daemon
+    _desktop = None
+    kill_lo_daemon(_daemon_pids[_slot])
+    if _daemon is not None:
+        _daemon.wait()
+    _daemon = start_lo_daemon(_slot)
+    _daemon_pids[_slot] = _daemon.pid
+
+
+def lo_desktop():
+    """Return this worker's LO Desktop, connecting to its daemon on first use."""
+    global _desktop
+    if _desktop is not None:
+        return _desktop
+
+    port = LO_BASE_PORT + worker_slot()
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext(
+        'com.sun.star.bridge.UnoUrlResolver', local_ctx)
+
+    # The daemon may still be booting — retry until it accepts connections
+    deadline = time.time() + TIMEOUT_SECONDS
+    while True:
+        try:
+            ctx = resolver.resolve(
+                f'uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext')
+            break
+        except NoConnectException:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+
+    _desktop = ctx.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', ctx)
+    return _desktop
+
+
+def lo_property(name, value):
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def convert_with_daemon(source_path, outdir):
+    """Convert a document to HTML in outdir via this worker's LO daemon.
+
+    A watchdog kills the daemon if the conversion takes longer than
+    TIMEOUT_SECONDS, raising TimeoutError. A daemon that was killed, crashed
+    or dropped the connection is restarted, to be reconnected on next use.
+    """
+    timed_out = threading.Event()
+    pgid = _daemon_pids[_slot]
+
+    def on_timeout():
+        timed_out.set()
+        kill_lo_daemon(pgid)
+
+    watchdog = threading.Timer(TIMEOUT_SECONDS, on_timeout)
+    watchdog.start()
+    try:
+        try:
+            desktop = lo_desktop()
+            doc = desktop.loadComponentFromURL(
+                Path(source_path).resolve().as_uri(), '_blank', 0, (lo_property('Hidden', True),))
+            if doc is None:
+                raise RuntimeError('LO could not load document')
+            try:
+                out_path = Path(outdir) / (Path(source_path).stem + '.html')
+                doc.storeToURL(out_path.as_uri(), (lo_property('FilterName', 'HTML (StarWriter)'),))
+            finally:
+                doc.close(True)
+        finally:
+            watchdog.cancel()
+    except (UnoRuntimeException, NoConnectException):
+        restart_lo_daemon()
+        if timed_out.is_set():
+            raise TimeoutError from None
+        raise
+
+    # The watchdog fired just as the conversion finished
+    if timed_out.is_set():
+        restart_lo_daemon()
+        raise TimeoutError
+
+
+def convert_with_cli(source_path, outdir):
+    """Convert a document to HTML in outdir with a one-shot soffice process.
+
+    Returns an error string, or None on success.
+    """
+    profile_dir = profile_dir_for(worker_slot())
+
+    cmd = [
+        'soffice',
+        '--headless',
+        '--norestore',
+        f'-env:UserInstallation=file://{profile_dir}',
+        '--convert-to', 'html',
+        '--outdir', outdir,
+        str(source_path),
+    ]
+
+    proc = subprocess.run(
+        cmd,
+        capture_output=True,
+        text=True,
+        timeout=TIMEOUT_SECONDS,
+    )
+
+    if proc.returncode != 0:
+        return f'LO exit code {proc.returncode}: {proc.stderr[:200]}'
+    return None
+
+
+def clear_dir(path):
+    """Remove everything inside path, keeping the directory itself."""
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.unlink(entry.path)
+
+
 def convert_one(args):
     """Convert a single source file with LibreOffice. Returns result dict."""
-    theme_name, source_filename, source_path, reader_html, worker_id, index, total = args
+    theme_name, source_filename, source_path, reader_html, index, total = args
 
     reader_slug = reader_html.stem
 
@@ -223,35 +506,24 @@ def convert_one(args):
         'skipped': False,
     }
 
-    # Create a per-file temp dir for conversion
-    tmpdir = tempfile.mkdtemp(prefix=f'lo_conv_{worker_id}_')
+    # Convert into this worker's long-lived conversion dir
+    tmpdir = _conv_dir
     try:
-        profile_dir = f'/tmp/lo_profile_{worker_id}'
-        os.makedirs(profile_dir, exist_ok=True)
-
-        cmd = [
-            'soffice',
-            '--headless',
-            '--norestore',
-            f'-env:UserInstallation=file://{profile_dir}',
-            '--convert-to', 'html',
-            '--outdir', tmpdir,
-            str(source_path),
-        ]
-
-        proc = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=TIMEOUT_SECONDS,
-        )
-
-        if proc.returncode != 0:
-            result['error'] = f'LO exit code {proc.returncode}: {proc.stderr[:200]}'
-            return result
+        if uno is not None:
+            convert_with_daemon(source_path, tmpdir)
+        else:
+            error = convert_with_cli(source_path, tmpdir)
+            if error:
+                result['error'] = error
+                return result
+
+        # One listing of the conversion dir; DirEntry objects carry their names
+        with os.scandir(tmpdir) as it:
+            entries = list(it)
 
         # Find the output HTML file
-        html_files = list(Path(tmpdir).glob('*.html')) + list(Path(tmpdir).glob('*.htm'))
+        html_files = ([e for e in entries if e.name.endswith('.html')]
+                      + [e for e in entries if e.name.endswith('.htm')])
         if not html_files:
             result['error'] = 'No HTML output produced'
             return result
@@ -259,12 +531,14 @@ def convert_one(args):
         lo_html_path = html_files[0]
 
         # Find companion image files (LO names them like filename_html_XXXX.png)
-        all_files = set(Path(tmpdir).iterdir())
         image_files = []
-        for f in sorted(all_files):
-            if f == lo_html_path:
+        # No need to sort: clean_lo_html orders images by name itself
+        for f in entries:
+            name = f.name
+            if name == lo_html_path.name:
                 continue
-            if f.suffix.lower() in ('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff', '.tif', '.svg', '.wmf', '.emf'):
+            dot = name.rfind('.')
+            if dot > 0 and name[dot:].lower() in IMAGE_EXTENSIONS:
                 image_files.append(f)
 
         if not image_files:
@@ -277,21 +551,28 @@ def convert_one(args):
         image_basenames = [f.name for f in image_files]
         cleaned_html, img_map = clean_lo_html(body_html, image_basenames, reader_slug)
 
+        # Move the images out before the conversion dir is emptied
+        staged = []
+        image_bytes = 0
+        for f in image_files:
+            new_name = img_map.get(f.name, f.name)
+            image_bytes += f.stat().st_size
+            staged_path = Path(_staging_dir) / f'{theme_name}__{reader_slug}__{new_name}'
+            os.rename(f, staged_path)
+            staged.append((staged_path, new_name))
+
         result['body_html'] = cleaned_html
-        result['image_files'] = [(f, img_map.get(f.name, f.name)) for f in image_files]
+        result['image_files'] = staged
         result['images'] = list(img_map.values())
         result['num_images'] = len(image_files)
+        result['image_bytes'] = image_bytes
 
-    except subprocess.TimeoutExpired:
+    except (subprocess.TimeoutExpired, TimeoutError):
         result['error'] = f'Timeout after {TIMEOUT_SECONDS}s'
     except Exception as e:
         result['error'] = str(e)
     finally:
-        # Don't clean tmpdir yet if we have images to copy
-        if result.get('image_files'):
-            result['_tmpdir'] = tmpdir
-        else:
-            shutil.rmtree(tmpdir, ignore_errors=True)
+        clear_dir(tmpdir)
 
     return result
 
@@ -304,21 +585,24 @@ def update_reader_page(result, dry_run=False):
     reader_slug = result['reader_slug']
     theme_dir = reader_path.parent.parent
 
-    before_size = reader_path.stat().st_size
+    # Image sizes were measured once when the images were staged
+    img_size = result.get('image_bytes', 0)
 
     if dry_run:
         # Calculate approximate after size
+        before_size = reader_path.stat().st_size
         body_size = len(result.get('body_html', '').encode('utf-8'))
-        img_size = sum(f.stat().st_size for f, _ in result.get('image_files', []))
         return before_size, before_size + body_size + img_size
 
-    # Read existing page
-    page_content = reader_path.read_text(encoding='utf-8')
-    new_body = result['body_html']
+    # Read existing page as bytes — the needles are ASCII, so byte offsets
+    # work without decoding the page and re-encoding it on write
+    page_content = reader_path.read_bytes()
+    before_size = len(page_content)
+    new_body = result['body_html'].encode('utf-8')
 
     # Find reader-content div and replace its contents using string ops
     # (avoids regex replacement issues with backslash sequences in LO HTML)
-    open_tag = '<div class="reader-content">'
+    open_tag = b'<div class="reader-content">'
     open_idx = page_content.find(open_tag)
     if open_idx == -1:
         print(f'  WARNING: Could not find reader-content div in {reader_path}')
@@ -326,41 +610,39 @@ def update_reader_page(result, dry_run=False):
 
     content_start = open_idx + len(open_tag)
 
-    # Find the matching </div> — it's the next </div> before <a class="file-link-btn">
-    file_link_idx = page_content.find('<a class="file-link-btn"', content_start)
+    # Find the matching </div> — it's the next </div> before <a class="file-link-btn">.
+    # Each search resumes where the previous one left off, so no span is scanned twice.
+    file_link_idx = page_content.find(b'<a class="file-link-btn"', content_start)
     if file_link_idx != -1:
         # Find the </div> just before the file-link-btn
-        close_idx = page_content.rfind('</div>', content_start, file_link_idx)
+        close_idx = page_content.rfind(b'</div>', content_start, file_link_idx)
+        if close_idx == -1:
+            # Fallback: first </div> after the link (none precede it)
+            close_idx = page_content.find(b'</div>', file_link_idx)
     else:
-        close_idx = -1
-
-    if close_idx == -1:
         # Fallback: find first </div> after the open tag
-        close_idx = page_content.find('</div>', content_start)
+        close_idx = page_content.find(b'</div>', content_start)
 
     if close_idx == -1:
         print(f'  WARNING: Could not find closing </div> in {reader_path}')
         return before_size, before_size
 
-    new_content = (
-        page_content[:content_start]
-        + f'\n<!-- lo-images -->\n{new_body}\n'
-        + page_content[close_idx:]
-    )
-
     # Copy images
     img_dir = theme_dir / 'read' / 'img' / reader_slug
     img_dir.mkdir(parents=True, exist_ok=True)
 
-    total_img_size = 0
     for src_file, new_name in result.get('image_files', []):
-        dst = img_dir / new_name
-        shutil.copy2(str(src_file), str(dst))
-        total_img_size += dst.stat().st_size
-
-    # Write updated page
-    reader_path.write_text(new_content, encoding='utf-8')
-    after_size = reader_path.stat().st_size + total_img_size
+        # Plain content copy (sendfile/copy_file_range); temp file metadata isn't worth keeping
+        shutil.copyfile(src_file, img_dir / new_name)
+
+    # Write updated page piecewise rather than building the whole new document
+    with reader_path.open('wb') as f:
+        page_size = f.write(page_content[:content_start])
+        page_size += f.write(b'\n<!-- lo-images -->\n')
+        page_size += f.write(new_body)
+        page_size += f.write(b'\n')
+        page_size += f.write(page_content[close_idx:])
+    after_size = page_size + img_size
 
     return before_size, after_size
 
@@ -402,15 +684,16 @@ def main():
     if not args.force:
         filtered = {}
         skipped_existing = 0
-        for key, reader_html in mapping.items():
-            content = reader_html.read_text(encoding='utf-8', errors='replace')
-            if '<!-- lo-images -->' in content:
+        for key, (reader_html, already_processed) in mapping.items():
+            if already_processed:
                 skipped_existing += 1
             else:
                 filtered[key] = reader_html
         if skipped_existing:
             print(f'  Skipping {skipped_existing} already-processed files (use --force to redo)')
         mapping = filtered
+    else:
+        mapping = {key: reader_html for key, (reader_html, _) in mapping.items()}
 
     # Prepare work items
     work = []
@@ -418,16 +701,16 @@ def main():
         source_path = ARCHIVE_ROOT / theme_name / 'files' / source_filename
         # Skip non-convertible file types
         ext = source_path.suffix.lower()
-        if ext not in ('.doc', '.docx', '.rtf', '.odt'):
+        if ext not in CONVERTIBLE_EXTENSIONS:
             continue
-        worker_id = i % args.workers
-        work.append((theme_name, source_filename, source_path, reader_html, worker_id, i + 1, len(mapping)))
+        work.append((theme_name, source_filename, source_path, reader_html, i + 1, len(mapping)))
 
     print(f'  {len(work)} files to convert')
     print()
 
     # Phase 2: Batch convert
-    print(f'Phase 2: Converting with LibreOffice ({args.workers} workers)...')
+    mode = 'UNO daemons' if uno is not None else 'CLI'
+    print(f'Phase 2: Converting with LibreOffice ({args.workers} workers, {mode})...')
     t0 = time.time()
 
     results = []
@@ -436,25 +719,40 @@ def main():
     skipped = 0
     with_images = 0
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers) as executor:
-        future_map = {executor.submit(convert_one, w): w for w in work}
+    slot_queue = multiprocessing.Queue()
+    for slot in range(args.workers):
+        slot_queue.put(slot)
+    work_root = tempfile.mkdtemp(prefix='lo_conv_')
+    os.mkdir(os.path.join(work_root, STAGING_SUBDIR))
+    # Each slot's current daemon process group; workers update it on restart
+    daemon_pids = multiprocessing.Array('i', args.workers)
+    daemons = start_lo_daemons(args.workers, daemon_pids) if uno is not None and work else []
 
-        for future in concurrent.futures.as_completed(future_map):
-            completed += 1
-            result = future.result()
-
-            if result['error']:
-                errors += 1
-                print(f'  [{completed}/{len(work)}] ERROR {result["theme"]}/{result["source"]}: {result["error"]}')
-            elif result['skipped']:
-                skipped += 1
-                if completed % 100 == 0 or completed == len(work):
-                    print(f'  [{completed}/{len(work)}] progress... ({with_images} with images, {skipped} without)')
-            else:
-                with_images += 1
-                n = result.get('num_images', 0)
-                print(f'  [{completed}/{len(work)}] {result["theme"]}/{result["source"]} → {n} image{"s" if n != 1 else ""}')
-                results.append(result)
+    try:
+        # Processes rather than threads: the LO body cleanup is pure Python
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=args.workers, initializer=init_worker, initargs=(slot_queue, work_root, daemon_pids)
+        ) as executor:
+            future_map = {executor.submit(convert_one, w): w for w in work}
+
+            for future in concurrent.futures.as_completed(future_map):
+                completed += 1
+                result = future.result()
+
+                if result['error']:
+                    errors += 1
+                    print(f'  [{completed}/{len(work)}] ERROR {result["theme"]}/{result["source"]}: {result["error"]}')
+                elif result['skipped']:
+                    skipped += 1
+                    if completed % 100 == 0 or completed == len(work):
+                        print(f'  [{completed}/{len(work)}] progress... ({with_images} with images, {skipped} without)')
+                else:
+                    with_images += 1
+                    n = result.get('num_images', 0)
+                    print(f'  [{completed}/{len(work)}] {result["theme"]}/{result["source"]} → {n} image{"s" if n != 1 else ""}')
+                    results.append(result)
+    finally:
+        stop_lo_daemons(daemons, daemon_pids)
 
     elapsed = time.time() - t0
     print(f'  Done in {elapsed:.1f}s: {with_images} files with images, {skipped} without, {errors} errors')
@@ -462,30 +760,38 @@ def main():
 
     if not results:
         print('No files with images found. Nothing to update.')
+        shutil.rmtree(work_root, ignore_errors=True)
         return
 
     # Phase 3: Update reader pages
     print(f'Phase 3: Updating {len(results)} reader pages...')
     t0 = time.time()
 
-    # Track stats per theme
+    # Track stats per theme (only touched from this thread)
     theme_stats = {}
-    for result in sorted(results, key=lambda r: r['reader']):
-        theme = result['theme']
-        if theme not in theme_stats:
-            theme_stats[theme] = {'updated': 0, 'images': 0, 'before': 0, 'after': 0}
 
-        before, after = update_reader_page(result, dry_run=args.dry_run)
+    # Page rewrites and image copies are pure I/O, so threads overlap them well
+    with concurrent.futures.ThreadPoolExecutor(max_workers=args.workers * 2) as executor:
+        future_map = {
+            executor.submit(update_reader_page, result, args.dry_run): result
+            for result in sorted(results, key=lambda r: r['reader'])
+        }
+
+        for future in concurrent.futures.as_completed(future_map):
+            result = future_map[future]
+            theme = result['theme']
+            if theme not in theme_stats:
+                theme_stats[theme] = {'updated': 0, 'images': 0, 'before': 0, 'after': 0}
+
+            before, after = future.result()
 
-        theme_stats[theme]['updated'] += 1
-        theme_stats[theme]['images'] += result.get('num_images', 0)
-        theme_stats[theme]['before'] += before
-        theme_stats[theme]['after'] += after
+            theme_stats[theme]['updated'] += 1
+            theme_stats[theme]['images'] += result.get('num_images', 0)
+            theme_stats[theme]['before'] += before
+            theme_stats[theme]['after'] += after
 
-        # Clean up temp dir
-        tmpdir = result.get('_tmpdir')
-        if tmpdir:
-            shutil.rmtree(tmpdir, ignore_errors=True)
+    # Clean up conversion and staging dirs
+    shutil.rmtree(work_root, ignore_errors=True)
 
     print(f'  Done in {time.time()-t0:.1f}s')
     print()
@@ -527,7 +833,7 @@ def main():
                 'before_bytes': s['before'],
                 'after_bytes': s['after'],
             }
-            for theme, s in theme_stats.items()
+            for theme, s in sorted(theme_stats.items())
         },
         'totals': {
             'updated': total_updated,
@@ -549,7 +855,9 @@ def main():
     }
 
     report_path = ARCHIVE_ROOT / 'scripts' / 'image_report.json'
-    report_path.write_text(json.dumps(report, indent=2) + '\n')
+    with report_path.open('w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
     print(f'Report written to {report_path}')
 
 
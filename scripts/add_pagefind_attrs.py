@@ -6,12 +6,21 @@ Adds:
 - data-pagefind-meta="theme" from the breadcrumb's theme link text
 - data-pagefind-filter="theme" for faceted filtering
 - data-pagefind-ignore to non-content pages (theme indexes, root index, etc.)
+
+Reader pages still exactly as the last completed run left them are skipped
+without being read; delete scripts/.pagefind_stamp to force a full pass.
 """
 
+import json
 import re
 from pathlib import Path
 
 ARCHIVE_ROOT = Path(__file__).resolve().parent.parent
+# JSON map of each reader page to [mtime_ns, size] as the last completed pass
+# left it; a page restored or copied with an older mtime no longer matches
+STAMP_PATH = ARCHIVE_ROOT / 'scripts' / '.pagefind_stamp'
+
+_HEADER_H1_RE = re.compile(r'<header class="site-header">\s*<h1(?=>)')
 
 THEME_NAMES = {
     '01-autobiography': 'Autobiography & Personal Narrative',
@@ -28,52 +37,94 @@ THEME_NAMES = {
 }
 
 
+def add_reader_attrs(html, theme_name):
+    """Return html with the pagefind attributes inserted, or None if unchanged.
+
+    Insertion points are located first and the page is rebuilt in one pass.
+    """
+    inserts = []  # (offset, text)
+
+    # Add title meta from h1
+    if 'data-pagefind-meta="title"' not in html:
+        m = _HEADER_H1_RE.search(html)
+        if m:
+            inserts.append((m.end(), ' data-pagefind-meta="title"'))
+
+    anchor = 'class="reader-content"'
+    idx = html.find(anchor)
+    if idx != -1:
+        pos = idx + len(anchor)
+
+        # Add data-pagefind-body to reader-content div
+        has_body = html.startswith(' data-pagefind-body', pos)
+        if has_body:
+            pos += len(' data-pagefind-body')
+        elif 'data-pagefind-body' not in html:
+            inserts.append((pos, ' data-pagefind-body'))
+            has_body = True
+
+        # Add theme filter/meta as a hidden element inside reader-content
+        if has_body and html.startswith('>', pos) and 'data-pagefind-filter="theme"' not in html:
+            tag = f'<span data-pagefind-filter="theme" data-pagefind-meta="theme" style="display:none">{theme_name}</span>\n'
+            inserts.append((pos + 1, '\n' + tag))
+
+    if not inserts:
+        return None
+
+    # The h1 normally precedes reader-content, but don't rely on it
+    inserts.sort(key=lambda ins: ins[0])
+    parts = []
+    prev = 0
+    for offset, text in inserts:
+        parts.append(html[prev:offset])
+        parts.append(text)
+        prev = offset
+    parts.append(html[prev:])
+    return ''.join(parts)
+
+
+def load_stamp():
+    """Return the page states recorded by the last completed pass."""
+    try:
+        return json.loads(STAMP_PATH.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+
+
 def process_reader_pages():
     """Add data-pagefind-body and theme metadata to reader pages."""
+    seen = load_stamp()
+    done = {}
+
     count = 0
+    unchanged = 0
     for theme_dir, theme_name in THEME_NAMES.items():
         read_dir = ARCHIVE_ROOT / theme_dir / 'read'
         if not read_dir.exists():
             continue
         for html_file in sorted(read_dir.glob('*.html')):
+            key = f'{theme_dir}/read/{html_file.name}'
+            st = html_file.stat()
+            state = [st.st_mtime_ns, st.st_size]
+            # Exactly as a previous run left it
+            if seen.get(key) == state:
+                done[key] = state
+                unchanged += 1
+                continue
             html = html_file.read_text(encoding='utf-8', errors='replace')
-
-            modified = False
-
-            # Add data-pagefind-body to reader-content div
-            if 'data-pagefind-body' not in html and 'class="reader-content"' in html:
-                html = html.replace(
-                    'class="reader-content"',
-                    'class="reader-content" data-pagefind-body',
-                    1
-                )
-                modified = True
-
-            # Add theme filter/meta as a hidden element inside reader-content
-            if 'data-pagefind-filter="theme"' not in html and 'data-pagefind-body' in html:
-                tag = f'<span data-pagefind-filter="theme" data-pagefind-meta="theme" style="display:none">{theme_name}</span>\n'
-                html = html.replace(
-                    'class="reader-content" data-pagefind-body>',
-                    'class="reader-content" data-pagefind-body>\n' + tag,
-                    1
-                )
-                modified = True
-
-            # Add title meta from h1
-            if 'data-pagefind-meta="title"' not in html:
-                html = re.sub(
-                    r'(<header class="site-header">\s*<h1)(>)',
-                    r'\1 data-pagefind-meta="title"\2',
-                    html,
-                    count=1
-                )
-                modified = True
-
-            if modified:
+            html = add_reader_attrs(html, theme_name)
+            if html is not None:
                 html_file.write_text(html, encoding='utf-8')
                 count += 1
+                st = html_file.stat()
+                state = [st.st_mtime_ns, st.st_size]
+            done[key] = state
+
+    # Record the pages as this pass leaves them, so our own writes are skipped
+    # next time
+    STAMP_PATH.write_text(json.dumps(done, separators=(',', ':')), encoding='utf-8')
 
-    print(f'Updated {count} reader pages')
+    print(f'Updated {count} reader pages ({unchanged} unchanged since last run)')
 
 
 def add_pagefind_ignore():
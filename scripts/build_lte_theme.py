@@ -7,9 +7,16 @@ to the original reader pages in their source themes.
 """
 
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from html import unescape
 
+try:
+    import re2
+except ImportError:
+    # Fall back to the stdlib's backtracking engine
+    re2 = None
+
 ARCHIVE_ROOT = Path(__file__).resolve().parent.parent
 
 # Patterns that indicate a letter to the editor (case-insensitive)
@@ -43,15 +50,65 @@ EXCLUDE_PATTERNS = [
     r'topics for (?:potential |future )?letters',
 ]
 
-# Near-duplicate slugs to exclude (keep the best version of each cluster)
+# Near-duplicate slugs to exclude, by theme (keep the best version of each cluster)
 DEDUP_EXCLUDE = {
-    ('04-holland-college', 'intro'),          # dup of 05/2-intro (shorter)
-    ('07-professional-career', 'clarity-4-docx'),  # dup of 05/clarity-7-docx
-    ('05-education-reform', 'd-clarity-1-docx'),   # shorter draft of clarity-7
+    '04-holland-college': frozenset({'intro'}),              # dup of 05/2-intro (shorter)
+    '07-professional-career': frozenset({'clarity-4-docx'}),  # dup of 05/clarity-7-docx
+    '05-education-reform': frozenset({'d-clarity-1-docx'}),   # shorter draft of clarity-7
 }
 
-COMPILED_INCLUDE = re.compile('|'.join(INCLUDE_PATTERNS), re.IGNORECASE)
-COMPILED_EXCLUDE = re.compile('|'.join(EXCLUDE_PATTERNS), re.IGNORECASE)
+
+def compile_any(patterns):
+    """Compile patterns into one case-insensitive alternation.
+
+    Uses RE2's linear-time automaton when google-re2 is installed; the
+    patterns stick to syntax both engines accept.
+    """
+    return (re2 or re).compile('(?i)(?:' + '|'.join(patterns) + ')')
+
+
+COMPILED_INCLUDE = compile_any(INCLUDE_PATTERNS)
+COMPILED_EXCLUDE = compile_any(EXCLUDE_PATTERNS)
+
+# Index row parsing
+_SLUG_RE = re.compile(r'href="read/([^"]+)\.html"')
+_TD_RE = re.compile(r'<td([^>]*)>(.*?)</td>', re.DOTALL)
+_DOWNLOAD_RE = re.compile(r'href="files/([^"]+)"')
+_TAG_RE = re.compile(r'<[^>]+>')
+_THEME_DIR_RE = re.compile(r'\d{2}-')
+
+
+def split_rows(tbody):
+    """Split a tbody into its <tr>...</tr> blocks."""
+    rows = []
+    start = tbody.find('<tr')
+    while start != -1:
+        # Skip tags that merely start with "tr"
+        if tbody[start + 3:start + 4] not in ('>', ' ', '\t', '\n', '\r'):
+            start = tbody.find('<tr', start + 3)
+            continue
+        end = tbody.find('</tr>', start)
+        if end == -1:
+            break
+        end += len('</tr>')
+        rows.append(tbody[start:end])
+        start = tbody.find('<tr', end)
+    return rows
+
+
+def element_content(html, open_tag, close_tag):
+    """Content of the first element whose start tag begins with open_tag.
+
+    Returns None if there is no such complete element.
+    """
+    start = html.find(open_tag)
+    if start == -1:
+        return None
+    start = html.find('>', start) + 1
+    end = html.find(close_tag, start)
+    if end == -1:
+        return None
+    return html[start:end]
 
 
 def extract_rows_from_index(index_path):
@@ -65,51 +122,74 @@ def extract_rows_from_index(index_path):
         return []
 
     tbody = html[tbody_start:tbody_end]
-    rows = re.findall(r'<tr(?:\s[^>]*)?>.*?</tr>', tbody, re.DOTALL)
+    rows = split_rows(tbody)
+
+    # Bind the per-row lookups to locals once; the loop runs per document
+    find_cells = _TD_RE.findall
+    search_slug = _SLUG_RE.search
+    search_download = _DOWNLOAD_RE.search
+    strip_tags = _TAG_RE.sub
+    unescape_ = unescape
 
     results = []
+    append = results.append
     for row in rows:
+        # Split the row into (attrs, content) cells in one pass; each field
+        # below is then searched for only in the cell that holds it:
+        # date | title | summary | read/download links
+        cells = find_cells(row)
+        summary_cell = cells[2][1] if len(cells) > 2 else row
+        links_cell = cells[-1][1] if cells else row
+
         # Extract slug from read link
-        slug_m = re.search(r'href="read/([^"]+)\.html"', row)
+        slug_m = search_slug(links_cell) or search_slug(row)
         if not slug_m:
             continue
         slug = slug_m.group(1)
 
         # Extract date
-        date_m = re.search(r'<td class="date-col">([^<]*)</td>', row)
-        date = date_m.group(1).strip() if date_m else 'Undated'
+        date = 'Undated'
+        for attrs, content in cells:
+            if attrs == ' class="date-col"' and '<' not in content:
+                date = content.strip()
+                break
 
         # Extract title (second td)
-        tds = re.findall(r'<td[^>]*>(.*?)</td>', row, re.DOTALL)
-        title = tds[1].strip() if len(tds) > 1 else slug
+        title = cells[1][1].strip() if len(cells) > 1 else slug
 
         # Extract full summary text (short + full)
-        summary = ''
-        short_m = re.search(r'<span class="short-summary">(.*?)</span>', row, re.DOTALL)
-        full_m = re.search(r'<div class="full-summary"[^>]*>(.*?)</div>', row, re.DOTALL)
-        if short_m:
-            summary += unescape(short_m.group(1))
-        if full_m:
-            summary += ' ' + unescape(full_m.group(1))
+        parts = []
+        short = element_content(summary_cell, '<span class="short-summary">', '</span>')
+        if short is None:
+            short = element_content(row, '<span class="short-summary">', '</span>')
+        full = element_content(summary_cell, '<div class="full-summary"', '</div>')
+        if full is None:
+            full = element_content(row, '<div class="full-summary"', '</div>')
+        if short is not None:
+            short = unescape_(short)
+            parts.append(short)
+        if full is not None:
+            parts.append(unescape_(full))
+        summary = ' '.join(parts)
 
         # Also check title for "Dear Editor" pattern
-        full_text = summary + ' ' + title
+        full_text = f'{summary} {title}'
 
         # Check highlight status
         is_highlight = 'data-highlight="true"' in row
 
         # Extract download link
-        dl_m = re.search(r'href="files/([^"]+)"', row)
+        dl_m = search_download(links_cell) or search_download(row)
         download = dl_m.group(1) if dl_m else None
 
-        results.append({
+        append({
             'slug': slug,
             'theme': theme,
             'title': title,
             'date': date,
             'summary_text': full_text,
-            'short_summary': unescape(short_m.group(1)) if short_m else '',
-            'full_summary': unescape(re.sub(r'<[^>]+>', '', full_m.group(1))) if full_m else '',
+            'short_summary': short if short is not None else '',
+            'full_summary': unescape_(strip_tags('', full)) if full is not None else '',
             'is_highlight': is_highlight,
             'download': download,
             'original_row': row,
@@ -120,7 +200,8 @@ def extract_rows_from_index(index_path):
 
 def is_letter_to_editor(doc):
     """Check if a document is a letter to the editor based on summary text."""
-    if (doc['theme'], doc['slug']) in DEDUP_EXCLUDE:
+    excluded = DEDUP_EXCLUDE.get(doc['theme'])
+    if excluded and doc['slug'] in excluded:
         return False
     text = doc['summary_text']
     if COMPILED_INCLUDE.search(text):
@@ -134,8 +215,8 @@ def build_index_html(letters):
     n_docs = len(letters)
     n_highlights = sum(1 for l in letters if l['is_highlight'])
 
-    rows = []
-    for doc in letters:
+    rows = [None] * n_docs
+    for i, doc in enumerate(letters):
         hl_attr = ' data-highlight="true"' if doc['is_highlight'] else ''
         read_link = f'../{doc["theme"]}/read/{doc["slug"]}.html'
 
@@ -159,7 +240,9 @@ def build_index_html(letters):
         else:
             summary_cell = short
 
-        rows.append(
+        # Kept as an f-string: it is compiled once with the function and
+        # renders several times faster than a str.format_map template
+        rows[i] = (
             f'<tr{hl_attr}>\n'
             f'  <td class="date-col">{doc["date"]}</td>\n'
             f'  <td>{doc["title"]}</td>\n'
@@ -270,23 +353,30 @@ function toggleRow(btn) {{
 </html>'''
 
 
+def scan_theme(index_path):
+    """Return the letters to the editor listed in one theme index."""
+    docs = extract_rows_from_index(index_path)
+    return [d for d in docs if is_letter_to_editor(d)]
+
+
 def main():
     all_letters = []
 
     # Scan all theme directories
+    index_paths = []
     for theme_dir in sorted(ARCHIVE_ROOT.iterdir()):
-        if not (theme_dir.is_dir() and re.match(r'\d{2}-', theme_dir.name)):
+        if not (theme_dir.is_dir() and _THEME_DIR_RE.match(theme_dir.name)):
             continue
         index_path = theme_dir / 'index.html'
-        if not index_path.exists():
-            continue
-
-        docs = extract_rows_from_index(index_path)
-        letters = [d for d in docs if is_letter_to_editor(d)]
-
-        if letters:
-            print(f'  {theme_dir.name}: {len(letters)} letters to the editor')
-            all_letters.extend(letters)
+        if index_path.exists():
+            index_paths.append(index_path)
+
+    # Themes are independent; map() keeps results in theme order
+    with ProcessPoolExecutor(max_workers=min(8, len(index_paths) or 1)) as pool:
+        for index_path, letters in zip(index_paths, pool.map(scan_theme, index_paths)):
+            if letters:
+                print(f'  {index_path.parent.name}: {len(letters)} letters to the editor')
+                all_letters.extend(letters)
 
     print(f'\n  Total: {len(all_letters)} letters to the editor')
 
@@ -5,14 +5,18 @@ Reads each reader page and extracts:
 - slug, title, summary, first ~2000 chars of text content
 - File size, garbage ratio (% non-printable characters)
 
-Outputs one JSON file per theme into scripts/review_data/.
+Outputs one JSON file per theme into scripts/review_data/. Pages linked from
+the letters-to-the-editor index also get their content text written to
+scripts/review_data/text/<theme>/<slug>.txt, normalized exactly as
+find_lte_duplicates extracts it, for that script to reuse.
 """
 
 import json
+import mmap
 import os
 import re
 import sys
-from html.parser import HTMLParser
+from html import unescape
 from pathlib import Path
 from concurrent.futures import ProcessPoolExecutor, as_completed
 
@@ -20,82 +24,154 @@ ARCHIVE_ROOT = Path(__file__).resolve().parent.parent
 THEMES = sorted(d for d in ARCHIVE_ROOT.iterdir()
                 if d.is_dir() and re.match(r'\d{2}-', d.name))
 OUTPUT_DIR = ARCHIVE_ROOT / 'scripts' / 'review_data'
+TEXT_DIR = OUTPUT_DIR / 'text'
+LTE_INDEX = ARCHIVE_ROOT / '12-letters-to-editor' / 'index.html'
 
 
-class TextExtractor(HTMLParser):
-    """Strip HTML tags, return plain text."""
-    def __init__(self):
-        super().__init__()
-        self.parts = []
-        self._skip = False
+# HTML stripping
+_SKIP_RE = re.compile(r'<!--.*?(?:-->|\Z)|<(script|style)\b[^>]*>.*?(?:</\1\s*>|\Z)',
+                      re.DOTALL | re.IGNORECASE)
+_ATTRS = r'(?:[^>"\']|"[^"]*"|\'[^\']*\')*'  # tag body; quoted values may contain '>'
+_BREAK_TAG_RE = re.compile(r'<(?:p|br|div|li|h[1-4]|pre)(?=[\s/>])' + _ATTRS + '>', re.IGNORECASE)
+_TAG_RE = re.compile(r'</?[a-zA-Z]' + _ATTRS + r'>|<[!?][^>]*>')
 
-    def handle_starttag(self, tag, attrs):
-        if tag in ('script', 'style'):
-            self._skip = True
-        if tag in ('p', 'br', 'div', 'li', 'h1', 'h2', 'h3', 'h4', 'pre'):
-            self.parts.append('\n')
+# Text copies for find_lte_duplicates, which normalizes with these same patterns
+_LTE_READ_LINK_RE = re.compile(r'href="\.\./([^/]+)/read/([^"]+)\.html"')
+_LTE_CONTENT_END_RE = re.compile(rb'</div>\s*(?:<a class="file-link-btn"|</div>)')
+_LTE_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
 
-    def handle_endtag(self, tag):
-        if tag in ('script', 'style'):
-            self._skip = False
+# Deletes every ASCII character that never counts as garbage, leaving only
+# ASCII control characters and non-ASCII text for isprintable() to judge
+_CLEAN_ASCII = dict.fromkeys(
+    i for i in range(128) if chr(i).isprintable() or chr(i) in '\n\r\t')
+# The same characters as bytes, for the all-ASCII fast path
+_CLEAN_ASCII_BYTES = bytes(_CLEAN_ASCII)
 
-    def handle_data(self, data):
-        if not self._skip:
-            self.parts.append(data)
 
-    def get_text(self):
-        return ''.join(self.parts).strip()
+def strip_html(html_str):
+    """Remove HTML tags and return plain text.
 
+    Comments and script/style blocks are dropped, block-level tags become
+    newlines and entities are unescaped.
+    """
+    text = _SKIP_RE.sub('', html_str)
+    text = _BREAK_TAG_RE.sub('\n', text)
+    text = _TAG_RE.sub('', text)
+    return unescape(text).strip()
+
+
+def lte_content_text(html):
+    """Content text of a reader page as find_lte_duplicates extracts it.
+
+    A copy of find_lte_duplicates.reader_content_text, which reads the text
+    copies back verbatim; the two must stay in step.
+    """
+    start = html.find(b'<div class="reader-content"')
+    if start == -1:
+        return ''
+    start = html.find(b'>', start) + 1
+    m = _LTE_CONTENT_END_RE.search(html, start) if start else None
+    if not m:
+        return ''
+    content = html[start:m.start()].decode('utf-8', errors='replace')
+    text = _LTE_TAG_RE.sub(' ', content)
+    return _WS_RE.sub(' ', text).strip()
 
-def strip_html(html_str):
-    """Remove HTML tags and return plain text."""
-    ext = TextExtractor()
-    ext.feed(html_str)
-    return ext.get_text()
+
+def lte_slugs_by_theme():
+    """Map theme name to the slugs of its pages linked from the LTE index."""
+    try:
+        html = LTE_INDEX.read_text(encoding='utf-8', errors='replace')
+    except OSError:
+        return {}
+    slugs = {}
+    for theme, slug in _LTE_READ_LINK_RE.findall(html):
+        slugs.setdefault(theme, set()).add(slug)
+    return slugs
+
+
+def write_text_copy(text_path, text):
+    """Write a page's text copy; a failure only costs find_lte_duplicates a reparse."""
+    try:
+        text_path.write_text(text, encoding='utf-8')
+    except OSError as e:
+        print(f'  WARNING: Could not write {text_path}: {e}')
 
 
 def extract_between(html, start_marker, end_marker):
-    """Extract content between two markers in HTML."""
+    """Extract content between two markers in HTML.
+
+    html may also be raw bytes or an mmap (with bytes markers); only the
+    extracted slice is decoded.
+    """
     idx = html.find(start_marker)
     if idx == -1:
         return ''
     idx += len(start_marker)
     end = html.find(end_marker, idx)
-    if end == -1:
-        return html[idx:]
-    return html[idx:end]
+    chunk = html[idx:] if end == -1 else html[idx:end]
+    if isinstance(chunk, bytes):
+        return chunk.decode('utf-8', errors='replace')
+    return chunk
 
 
 def garbage_ratio(text):
     """Fraction of non-printable, non-whitespace characters."""
     if not text:
         return 0.0
-    non_print = sum(1 for c in text if not c.isprintable() and c not in '\n\r\t')
+    if text.isascii():
+        # Whatever survives deleting the clean bytes is garbage
+        return len(text.encode('ascii').translate(None, _CLEAN_ASCII_BYTES)) / len(text)
+    rest = text.translate(_CLEAN_ASCII)
+    non_print = sum(1 for c in rest if not c.isprintable() and c not in '\n\r\t')
     return non_print / len(text)
 
 
-def process_reader_page(filepath):
-    """Extract metadata from a single reader page."""
+def process_reader_page(filepath, text_path=None):
+    """Extract metadata from a single reader page.
+
+    If text_path is given, the page's content text is also written there for
+    find_lte_duplicates (empty pages get none; it skips those itself).
+    """
     slug = filepath.stem
-    size = filepath.stat().st_size
+    size = 0
+    text = None
 
+    # Search the raw bytes via mmap and decode only the pieces we keep; the
+    # size comes from fstat on the open file rather than a separate stat()
     try:
-        html = filepath.read_text(encoding='utf-8', errors='replace')
+        with open(filepath, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                record = parse_reader_page(b'', slug, size)
+            else:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as html:
+                    record = parse_reader_page(html, slug, size)
+                    if text_path is not None:
+                        text = lte_content_text(html)
     except Exception as e:
         return {'slug': slug, 'error': str(e), 'size': size}
 
+    if text is not None:
+        write_text_copy(text_path, text)
+    return record
+
+
+def parse_reader_page(html, slug, size):
+    """Extract metadata from a reader page's raw bytes."""
     # Title from <h1>
-    m = re.search(r'<h1>(.*?)</h1>', html, re.DOTALL)
-    title = strip_html(m.group(1)).strip() if m else slug
+    m = re.search(rb'<h1>(.*?)</h1>', html, re.DOTALL)
+    title = strip_html(m.group(1).decode('utf-8', errors='replace')).strip() if m else slug
 
     # Summary from <div class="reader-summary">
-    summary_html = extract_between(html, '<div class="reader-summary">', '</div>')
+    summary_html = extract_between(html, b'<div class="reader-summary">', b'</div>')
     summary = strip_html(summary_html).strip()
 
     # Content from <div class="reader-content">
-    content_html = extract_between(html, '<div class="reader-content">', '\n<a class="file-link-btn"')
+    content_html = extract_between(html, b'<div class="reader-content">', b'\n<a class="file-link-btn"')
     if not content_html:
-        content_html = extract_between(html, '<div class="reader-content">', '</div>\n</main>')
+        content_html = extract_between(html, b'<div class="reader-content">', b'</div>\n</main>')
     content_text = strip_html(content_html).strip()
 
     # Compute garbage ratio on first 5000 chars of content
@@ -118,16 +194,29 @@ def process_reader_page(filepath):
     }
 
 
-def process_theme(theme_dir):
-    """Process all reader pages in a theme directory."""
+def process_theme(theme_dir, lte_slugs=frozenset()):
+    """Process all reader pages in a theme directory.
+
+    Pages whose slugs are in lte_slugs also get a text copy for
+    find_lte_duplicates.
+    """
     read_dir = theme_dir / 'read'
     if not read_dir.exists():
         return theme_dir.name, []
 
+    text_dir = TEXT_DIR / theme_dir.name
+    if lte_slugs:
+        try:
+            text_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f'  WARNING: Could not create {text_dir}: {e}')
+            lte_slugs = frozenset()
+
     pages = sorted(read_dir.glob('*.html'))
     results = []
     for p in pages:
-        results.append(process_reader_page(p))
+        text_path = text_dir / f'{p.stem}.txt' if p.stem in lte_slugs else None
+        results.append(process_reader_page(p, text_path))
     return theme_dir.name, results
 
 
@@ -139,8 +228,12 @@ def main():
 
     print(f"Extracting from {len(THEMES)} themes...")
 
+    # Only the pages find_lte_duplicates reads get text copies
+    lte_slugs = lte_slugs_by_theme()
+
     with ProcessPoolExecutor(max_workers=min(8, len(THEMES))) as pool:
-        futures = {pool.submit(process_theme, t): t.name for t in THEMES}
+        futures = {pool.submit(process_theme, t, lte_slugs.get(t.name, frozenset())): t.name
+                   for t in THEMES}
         for future in as_completed(futures):
             theme_name = futures[future]
             name, results = future.result()
@@ -148,9 +241,12 @@ def main():
             # Count high-garbage files
             flagged = sum(1 for r in results if r.get('garbage_ratio', 0) > 0.05)
 
+            # One compact record per line: each json.dumps call takes the C
+            # encoder (indent= forces the pure-Python one) and the file stays
+            # readable a document at a time
             out_path = OUTPUT_DIR / f'{name}.json'
-            with open(out_path, 'w') as f:
-                json.dump(results, f, indent=1)
+            records = ',\n'.join(json.dumps(r) for r in results)
+            out_path.write_text(f'[\n{records}\n]\n' if records else '[]\n')
 
             size_kb = out_path.stat().st_size / 1024
             print(f"  {name}: {len(results)} docs, {flagged} high-garbage, {size_kb:.0f} KB JSON")
@@ -2,67 +2,213 @@
 """Find duplicate/near-duplicate letters to the editor.
 
 Reads all reader pages linked from the LTE theme index, extracts text content,
-and identifies pairs with high text similarity.
+and identifies pairs with high text similarity. Where extract_for_review has
+left an up-to-date plain-text copy of a page in review_data/text/, that is read
+instead of the HTML.
+
+Byte-identical texts are grouped by hash first and only one document of each
+group takes part in the similarity search. Every pair whose lengths allow a
+match is scored; no word-level screen is applied, since OCR noise and
+rewording can leave near-duplicates with little word overlap that still score
+above the threshold. Pairs are scored by normalized Indel similarity
+(twice the longest common subsequence over the total length): rapidfuzz's
+fuzz.ratio when it is installed, the same ratio in pure Python otherwise.
 """
 
+import mmap
 import re
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, product
+from hashlib import blake2b
 from pathlib import Path
-from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz import fuzz
+except ImportError:
+    # Fall back to the pure-Python Indel ratio
+    fuzz = None
 
 ARCHIVE_ROOT = Path(__file__).resolve().parent.parent
 LTE_INDEX = ARCHIVE_ROOT / '12-letters-to-editor' / 'index.html'
+TEXT_DIR = ARCHIVE_ROOT / 'scripts' / 'review_data' / 'text'  # extract_for_review output
 
+COMPARE_CHARS = 2000     # only the start of each text is compared
+SIMILARITY_THRESHOLD = 0.7  # Indel ratio; unrelated letters score about 0.4-0.45
+MIN_LENGTH_RATIO = 0.3   # texts more than ~3x apart in length are never compared
 
-def extract_text_from_reader(path):
-    """Extract plain text from a reader page's .reader-content div."""
-    if not path.exists():
+# The reader-content div ends at the first </div> followed by the download
+# button or the enclosing </div>
+_CONTENT_END_RE = re.compile(rb'</div>\s*(?:<a class="file-link-btn"|</div>)')
+_TAG_RE = re.compile(r'<[^>]+>')
+_WS_RE = re.compile(r'\s+')
+
+# LTE index parsing
+_TD_RE = re.compile(r'<td[^>]*>(.*?)</td>', re.DOTALL)
+# Link like ../05-education-reform/read/slug.html
+_READ_LINK_RE = re.compile(r'href="\.\./([^/]+)/read/([^"]+)\.html"')
+
+
+def reader_content_text(html):
+    """Return the normalized plain text of a reader page's .reader-content div.
+
+    html is the page's raw bytes (or an mmap of them); only the content div is
+    decoded. Tags become spaces and whitespace runs collapse to one space.
+    extract_for_review writes its text copies with a copy of this function
+    (lte_content_text); the two must stay in step.
+    """
+    start = html.find(b'<div class="reader-content"')
+    if start == -1:
         return ''
-    html = path.read_text(encoding='utf-8', errors='replace')
-    # Find reader-content div
-    m = re.search(r'<div class="reader-content"[^>]*>(.*?)</div>\s*(?:<a class="file-link-btn"|</div>)', html, re.DOTALL)
+    start = html.find(b'>', start) + 1
+    m = _CONTENT_END_RE.search(html, start) if start else None
     if not m:
         return ''
-    content = m.group(1)
+    content = html[start:m.start()].decode('utf-8', errors='replace')
     # Strip HTML tags
-    text = re.sub(r'<[^>]+>', ' ', content)
+    text = _TAG_RE.sub(' ', content)
     # Collapse whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    return _WS_RE.sub(' ', text).strip()
+
+
+def read_text_sidecar(path, text_path):
+    """Return the plain-text copy of a reader page, or None if it is stale."""
+    try:
+        if text_path.stat().st_mtime < path.stat().st_mtime:
+            return None
+        return text_path.read_text(encoding='utf-8')
+    except OSError:
+        return None
+
+
+def extract_text_from_reader(path, text_path=None):
+    """Extract plain text from a reader page's .reader-content div."""
+    if not path.exists() or path.stat().st_size == 0:
+        return ''
+    if text_path is not None:
+        text = read_text_sidecar(path, text_path)
+        if text is not None:
+            return text
+    # Search the raw bytes via mmap and decode only the content div
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as html:
+        return reader_content_text(html)
+
+
+def split_rows(html):
+    """Split html into its <tr>...</tr> blocks, as build_lte_theme does."""
+    rows = []
+    start = html.find('<tr')
+    while start != -1:
+        # Skip tags that merely start with "tr"
+        if html[start + 3:start + 4] not in ('>', ' ', '\t', '\n', '\r'):
+            start = html.find('<tr', start + 3)
+            continue
+        end = html.find('</tr>', start)
+        if end == -1:
+            break
+        end += len('</tr>')
+        rows.append(html[start:end])
+        start = html.find('<tr', end)
+    return rows
 
 
 def get_lte_documents():
     """Parse the LTE index to get all document references."""
     html = LTE_INDEX.read_text(encoding='utf-8', errors='replace')
     docs = []
-    rows = re.findall(r'<tr[^>]*>.*?</tr>', html, re.DOTALL)
+    rows = split_rows(html)
     for row in rows:
-        # Extract theme and slug from link like ../05-education-reform/read/slug.html
-        m = re.search(r'href="\.\./([^/]+)/read/([^"]+)\.html"', row)
+        # Split into cells once; the read link lives in the last one
+        tds = _TD_RE.findall(row)
+        # Extract theme and slug from the read link
+        m = (tds and _READ_LINK_RE.search(tds[-1])) or _READ_LINK_RE.search(row)
         if not m:
             continue
         theme, slug = m.group(1), m.group(2)
         # Extract title
-        tds = re.findall(r'<td[^>]*>(.*?)</td>', row, re.DOTALL)
-        title = re.sub(r'<[^>]+>', '', tds[1]).strip() if len(tds) > 1 else slug
-        date = re.sub(r'<[^>]+>', '', tds[0]).strip() if tds else ''
+        title = _TAG_RE.sub('', tds[1]).strip() if len(tds) > 1 else slug
+        date = _TAG_RE.sub('', tds[0]).strip() if tds else ''
         docs.append({
             'theme': theme,
             'slug': slug,
             'title': title,
             'date': date,
             'path': ARCHIVE_ROOT / theme / 'read' / f'{slug}.html',
+            'text_path': TEXT_DIR / theme / f'{slug}.txt',
         })
     return docs
 
 
+def indel_ratio(a, b):
+    """Normalized Indel similarity of two strings, as rapidfuzz's fuzz.ratio.
+
+    The longest common subsequence is found bit-parallel (Hyyrö): one bit of a
+    big int per character of the shorter string, updated once per character
+    of the longer one.
+    """
+    if not a and not b:
+        return 1.0
+    if len(a) < len(b):
+        a, b = b, a
+    masks = {}
+    for i, c in enumerate(b):
+        masks[c] = masks.get(c, 0) | (1 << i)
+    full = (1 << len(b)) - 1
+    v = full
+    for c in a:
+        u = v & masks.get(c, 0)
+        v = ((v + u) | (v - u)) & full
+    lcs = len(b) - bin(v).count('1')
+    return 2 * lcs / (len(a) + len(b))
+
+
+def similarity(a, b):
+    """Indel similarity ratio of two strings, from 0.0 to 1.0."""
+    if fuzz is not None:
+        return fuzz.ratio(a, b) / 100.0
+    return indel_ratio(a, b)
+
+
+def text_hash(text):
+    """Short digest of a text, for grouping identical texts."""
+    return blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def candidate_pairs(docs):
+    """Return (i, j) index pairs, i < j, whose lengths allow a match.
+
+    Pairs whose full texts differ in length by more than MIN_LENGTH_RATIO are
+    left out, as are pairs whose compared slices are too far apart in length
+    for the Indel ratio (at most twice the shorter over the total) to exceed
+    SIMILARITY_THRESHOLD. Documents are swept in order of length, so the scan
+    for a document stops at the first partner that is too long.
+    """
+    lengths = [d['text_len'] for d in docs]
+    order = sorted(range(len(docs)), key=lengths.__getitem__)
+    pairs = []
+    for x, i in enumerate(order):
+        short = min(lengths[i], COMPARE_CHARS)
+        for j in order[x + 1:]:
+            if lengths[i] / lengths[j] < MIN_LENGTH_RATIO:
+                break
+            if 2 * short <= SIMILARITY_THRESHOLD * (short + min(lengths[j], COMPARE_CHARS)):
+                break
+            pairs.append((i, j) if i < j else (j, i))
+    return pairs
+
+
 def main():
     docs = get_lte_documents()
     print(f'Reading {len(docs)} reader pages...\n')
 
-    # Extract text from all pages
-    for doc in docs:
-        doc['text'] = extract_text_from_reader(doc['path'])
-        doc['text_len'] = len(doc['text'])
+    # Extract text from all pages; pages are independent, map() keeps order
+    with ProcessPoolExecutor(max_workers=min(8, len(docs) or 1)) as pool:
+        texts = pool.map(extract_text_from_reader,
+                         [d['path'] for d in docs], [d['text_path'] for d in docs],
+                         chunksize=16)
+        for doc, text in zip(docs, texts):
+            doc['text'] = text
+            doc['text_len'] = len(text)
 
     # Find empty/very short documents
     print('── Very short documents (< 100 chars) ──')
@@ -72,25 +218,36 @@ def main():
     if not short:
         print('  None')
 
-    # Compare all pairs for similarity
-    print(f'\n── Checking {len(docs) * (len(docs)-1) // 2} pairs for similarity ──')
-    duplicates = []
-    for i in range(len(docs)):
-        for j in range(i + 1, len(docs)):
-            a, b = docs[i], docs[j]
-            # Skip if either is very short (< 50 chars)
-            if a['text_len'] < 50 or b['text_len'] < 50:
-                continue
-            # Quick length check — if lengths differ by >3x, skip
-            ratio = min(a['text_len'], b['text_len']) / max(a['text_len'], b['text_len'])
-            if ratio < 0.3:
-                continue
-            # Compare first 2000 chars for speed
-            sim = SequenceMatcher(None, a['text'][:2000], b['text'][:2000]).ratio()
-            if sim > 0.6:
-                duplicates.append((sim, a, b))
-
-    duplicates.sort(key=lambda x: -x[0])
+    # Skip very short documents (< 50 chars) entirely
+    candidates = [d for d in docs if d['text_len'] >= 50]
+
+    # Byte-identical texts are duplicates outright; group them by hash and
+    # keep one representative of each group for the similarity search
+    groups = defaultdict(list)
+    for i, d in enumerate(candidates):
+        groups[text_hash(d['text'])].append(i)
+    groups = list(groups.values())
+    found = []  # (sim, i, j) with candidate indices i < j
+    for members in groups:
+        found.extend((1.0, i, j) for i, j in combinations(members, 2))
+
+    reps = [candidates[members[0]] for members in groups]
+
+    # Only compare pairs whose lengths allow a match
+    pairs = candidate_pairs(reps)
+    n_all = len(reps) * (len(reps) - 1) // 2
+    print(f'\n── Checking {len(pairs)} candidate pairs (of {n_all}) for similarity ──')
+    for x, y in sorted(pairs):
+        a, b = reps[x], reps[y]
+        # Compare first 2000 chars for speed
+        sim = similarity(a['text'][:COMPARE_CHARS], b['text'][:COMPARE_CHARS])
+        if sim > SIMILARITY_THRESHOLD:
+            # The match holds for every member of both identical-text groups
+            for i, j in product(groups[x], groups[y]):
+                found.append((sim, min(i, j), max(i, j)))
+
+    found.sort(key=lambda f: (-f[0], f[1], f[2]))
+    duplicates = [(sim, candidates[i], candidates[j]) for sim, i, j in found]
 
     if duplicates:
         print(f'\n── {len(duplicates)} similar pairs found ──\n')
@@ -100,7 +257,7 @@ def main():
             print(f'    B: [{b["date"]:>15}] {b["theme"]}/{b["slug"]} — {b["title"]} ({b["text_len"]} chars)')
             print()
     else:
-        print('  No similar pairs found above 60% threshold')
+        print(f'  No similar pairs found above {SIMILARITY_THRESHOLD:.0%} threshold')
 
     print(f'\nTotal: {len(docs)} documents, {len(duplicates)} similar pairs')
 
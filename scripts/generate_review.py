@@ -11,9 +11,17 @@ Styled with the existing css/style.css.
 import json
 import os
 import re
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to the stdlib parser
+    orjson = None
+
 ARCHIVE_ROOT = Path(__file__).resolve().parent.parent
 FLAGS_DIR = ARCHIVE_ROOT / 'scripts' / 'review_data'
 REVIEW_DIR = ARCHIVE_ROOT / 'review'
@@ -43,36 +51,44 @@ CRITERION_LABELS = {
     8: 'Low Archival Value',
 }
 
-# Load review_data JSONs for summary lookup
-_review_data_cache = {}
-
-def get_doc_summary(theme, slug):
-    """Look up the summary for a doc from the review_data JSON."""
-    if theme not in _review_data_cache:
-        path = FLAGS_DIR / f'{theme}.json'
-        if path.exists():
-            with open(path) as f:
-                data = json.load(f)
-            _review_data_cache[theme] = {d['slug']: d for d in data}
-        else:
-            _review_data_cache[theme] = {}
-    doc = _review_data_cache[theme].get(slug, {})
+
+def read_json(path):
+    """Parse a JSON file, using orjson when it is installed.
+
+    Both parsers take the raw bytes, so there is no separate text decode.
+    """
+    data = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_theme_docs(theme):
+    """Load a theme's review_data JSON, indexed by slug."""
+    path = FLAGS_DIR / f'{theme}.json'
+    if not path.exists():
+        return {}
+    return {d['slug']: d for d in read_json(path)}
+
+
+def get_doc_summary(docs, slug):
+    """Look up the summary for a doc in its theme's load_theme_docs() dict."""
+    doc = docs.get(slug, {})
     return doc.get('summary', ''), doc.get('size', 0), doc.get('garbage_ratio', 0)
 
 
 CRITERION_FROM_LABEL = {v.lower(): k for k, v in CRITERION_LABELS.items()}
 
+_FLAGS_FILENAME_RE = re.compile(r'flags_(?:p2_)?(\d{2})')
+THEME_BY_NUMBER = {name.split('-', 1)[0]: name for name in THEME_NAMES}
+
 
 def infer_theme_from_filename(filename):
     """Infer theme from flags filename like flags_09.json or flags_p2_09.json."""
-    m = re.match(r'flags_(?:p2_)?(\d{2})', filename)
+    m = _FLAGS_FILENAME_RE.match(filename)
     if not m:
         return ''
-    num = m.group(1)
-    for name in THEME_NAMES:
-        if name.startswith(num + '-'):
-            return name
-    return ''
+    return THEME_BY_NUMBER.get(m.group(1), '')
 
 
 def normalize_flag(flag, source_filename):
@@ -90,67 +106,111 @@ def normalize_flag(flag, source_filename):
     return flag
 
 
+@dataclass(slots=True)
+class Flag:
+    """The fields of a normalized flag that the review pages use."""
+    slug: str = ''
+    theme: str = ''
+    recommendation: str | None = None  # None when the flag gives none
+    reason: str = ''
+    criterion: int = 0
+
+    @classmethod
+    def from_dict(cls, flag):
+        """Build a Flag from a normalize_flag() dict, ignoring other keys."""
+        return cls(flag.get('slug', ''), flag.get('theme', ''), flag.get('recommendation'),
+                   flag.get('reason', ''), flag.get('criterion', 0))
+
+
 def load_all_flags():
-    """Load all flags_*.json files, merge, and deduplicate by theme+slug."""
+    """Load all flags_*.json files, merge, and deduplicate by theme+slug.
+
+    Pass-2 files (flags_p2_*.json) are wanted here too, so unlike
+    prep_review_pass2 the glob is not narrowed.
+    """
     all_flags = []
     seen = set()
     for p in sorted(FLAGS_DIR.glob('flags_*.json')):
-        with open(p) as f:
-            try:
-                flags = json.load(f)
-                if isinstance(flags, list):
-                    for flag in flags:
-                        flag = normalize_flag(flag, p.name)
-                        key = (flag.get('theme', ''), flag.get('slug', ''))
-                        if key not in seen:
-                            seen.add(key)
-                            all_flags.append(flag)
-            except json.JSONDecodeError:
-                print(f"  WARNING: Could not parse {p.name}")
+        try:
+            flags = read_json(p)
+            if isinstance(flags, list):
+                for flag in flags:
+                    flag = Flag.from_dict(normalize_flag(flag, p.name))
+                    key = (flag.theme, flag.slug)
+                    if key not in seen:
+                        seen.add(key)
+                        all_flags.append(flag)
+        except json.JSONDecodeError:
+            print(f"  WARNING: Could not parse {p.name}")
     return all_flags
 
 
 def html_escape(s):
+    # Chained str.replace beats a str.translate table several times over:
+    # each replace is a C-level scan that returns the string itself when
+    # there is nothing to replace
     return (s or '').replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
 
 
-def render_flag_row(flag):
-    """Render a single flagged document as an HTML card with checkbox."""
-    slug = flag.get('slug', '')
-    theme = flag.get('theme', '')
-    rec = flag.get('recommendation', 'REVIEW')
-    reason = flag.get('reason', '')
-    criterion = flag.get('criterion', 0)
-    criterion_label = CRITERION_LABELS.get(criterion, f'Criterion {criterion}')
+# Fixed labels escaped once up front rather than on every card
+CRITERION_LABELS_HTML = {k: html_escape(v) for k, v in CRITERION_LABELS.items()}
+REC_HTML = {'EXCLUDE': 'EXCLUDE', 'REVIEW': 'REVIEW'}
 
-    summary, size, garbage_ratio = get_doc_summary(theme, slug)
+# (card class, badge class, checkbox state) for each kind of card
+EXCLUDE_CLASSES = ('flag-exclude', 'badge-exclude', 'checked')
+REVIEW_CLASSES = ('flag-review', 'badge-review', '')
+
+
+@lru_cache(maxsize=None)
+def theme_html(theme):
+    """Return a theme's escaped name and reader-link prefix, built once."""
+    return html_escape(theme), f'../{theme}/read/'
+
+
+def render_flag_row(flag, docs):
+    """Render a single flagged document as an HTML card with checkbox.
+
+    docs is the flag's theme from load_theme_docs().
+    """
+    slug = flag.slug
+    theme = flag.theme
+    rec = 'REVIEW' if flag.recommendation is None else flag.recommendation
+    reason = flag.reason
+    criterion = flag.criterion
+    criterion_label = CRITERION_LABELS_HTML.get(criterion, f'Criterion {criterion}')
+    rec_html = REC_HTML.get(rec) or html_escape(rec)
+
+    summary, size, garbage_ratio = get_doc_summary(docs, slug)
     size_kb = size / 1024 if size else 0
 
-    rec_class = 'exclude' if rec == 'EXCLUDE' else 'review'
-    reader_link = f'../{theme}/read/{slug}.html'
-    checked = 'checked' if rec == 'EXCLUDE' else ''
-
-    parts = []
-    parts.append(f'<div class="flag-card flag-{rec_class}" data-slug="{html_escape(slug)}" data-theme="{html_escape(theme)}">')
-    parts.append(f'  <div class="flag-header">')
-    parts.append(f'    <label class="flag-check"><input type="checkbox" {checked} data-slug="{html_escape(slug)}" data-theme="{html_escape(theme)}"><span class="checkmark"></span></label>')
-    parts.append(f'    <span class="flag-badge badge-{rec_class}">{html_escape(rec)}</span>')
-    parts.append(f'    <span class="flag-criterion">{html_escape(criterion_label)}</span>')
-    if size_kb > 0:
-        parts.append(f'    <span class="flag-size">{size_kb:.0f} KB</span>')
-    if garbage_ratio and garbage_ratio > 0.01:
-        parts.append(f'    <span class="flag-garbage">{garbage_ratio:.1%} garbage</span>')
-    parts.append(f'  </div>')
-    parts.append(f'  <h3><a href="{reader_link}" target="_blank">{html_escape(slug)}</a></h3>')
-    if summary:
-        parts.append(f'  <p class="flag-summary">{html_escape(summary)}</p>')
-    parts.append(f'  <p class="flag-reason"><strong>Reason:</strong> {html_escape(reason)}</p>')
-    parts.append(f'</div>')
-    return '\n'.join(parts)
-
-
-PAGE_CSS = """
-<style>
+    card_class, badge_class, checked = EXCLUDE_CLASSES if rec == 'EXCLUDE' else REVIEW_CLASSES
+    theme_e, reader_prefix = theme_html(theme)
+    slug_e = html_escape(slug)
+
+    # Optional lines carry their own newline so the card is one f-string
+    size_html = f'    <span class="flag-size">{size_kb:.0f} KB</span>\n' if size_kb > 0 else ''
+    garbage_html = (f'    <span class="flag-garbage">{garbage_ratio:.1%} garbage</span>\n'
+                    if garbage_ratio and garbage_ratio > 0.01 else '')
+    summary_html = f'  <p class="flag-summary">{html_escape(summary)}</p>\n' if summary else ''
+
+    return (
+        f'<div class="flag-card {card_class}" data-slug="{slug_e}" data-theme="{theme_e}">\n'
+        f'  <div class="flag-header">\n'
+        f'    <label class="flag-check"><input type="checkbox" {checked} data-slug="{slug_e}" data-theme="{theme_e}"><span class="checkmark"></span></label>\n'
+        f'    <span class="flag-badge {badge_class}">{rec_html}</span>\n'
+        f'    <span class="flag-criterion">{criterion_label}</span>\n'
+        f'{size_html}{garbage_html}'
+        f'  </div>\n'
+        f'  <h3><a href="{reader_prefix}{slug}.html" target="_blank">{slug_e}</a></h3>\n'
+        f'{summary_html}'
+        f'  <p class="flag-reason"><strong>Reason:</strong> {html_escape(reason)}</p>\n'
+        f'</div>'
+    )
+
+
+# Written once to review/review.css and review/review.js, which every page
+# links, rather than inlined into each page
+PAGE_CSS = """\
   .flag-card {
     background: var(--card-bg);
     border: 1px solid var(--card-border);
@@ -300,11 +360,9 @@ PAGE_CSS = """
   }
   .review-toolbar button.primary:hover { background: #e74c3c; }
   .toolbar-spacer { flex: 1; }
-</style>
 """
 
-PAGE_JS = """
-<script>
+PAGE_JS = """\
 (function() {
   const STORAGE_KEY = 'archiveReviewSelections';
 
@@ -399,7 +457,6 @@ PAGE_JS = """
     init();
   }
 })();
-</script>
 """
 
 
@@ -414,8 +471,12 @@ TOOLBAR_HTML = """
 """
 
 
-def render_page(title, subtitle, body_html, breadcrumbs=None):
-    """Wrap body content in the standard page template."""
+def write_page(out_path, title, subtitle, body_chunks, breadcrumbs=None):
+    """Write a page in the standard template.
+
+    body_chunks is any iterable of HTML strings; they are streamed to the
+    file one per line, so the full page is never built in memory.
+    """
     bc = ''
     if breadcrumbs:
         bc_parts = []
@@ -424,14 +485,14 @@ def render_page(title, subtitle, body_html, breadcrumbs=None):
         bc_parts.append(html_escape(breadcrumbs[-1][0]))
         bc = '<div class="breadcrumb">' + ' <span class="sep">&rsaquo;</span> '.join(bc_parts) + '</div>'
 
-    return f"""<!DOCTYPE html>
+    head = f"""<!DOCTYPE html>
 <html lang="en">
 <head>
 <meta charset="UTF-8">
 <meta name="viewport" content="width=device-width, initial-scale=1.0">
 <title>{html_escape(title)}</title>
 <link rel="stylesheet" href="../css/style.css">
-{PAGE_CSS}
+<link rel="stylesheet" href="review.css">
 </head>
 <body>
 {TOOLBAR_HTML}
@@ -441,19 +502,53 @@ def render_page(title, subtitle, body_html, breadcrumbs=None):
 </header>
 <main class="container">
 {bc}
-{body_html}
-</main>
+"""
+    tail = f"""</main>
 <footer class="site-footer">
   <a href="../index.html">Archive Home</a>
 </footer>
-{PAGE_JS}
+<script src="review.js"></script>
 </body>
 </html>
 """
+    with open(out_path, 'w', encoding='utf-8', buffering=1 << 20) as f:
+        f.write(head)
+        f.writelines(f'{chunk}\n' for chunk in body_chunks)
+        f.write(tail)
+
+
+def write_theme_page(theme, flags, tally):
+    """Write one theme's review page and return its rendered flag cards."""
+    theme_label = THEME_NAMES.get(theme, theme)
+    n_exclude, n_review = tally
+
+    body = []
+    body.append(f'<div class="stats-bar">')
+    body.append(f'  <div><span class="stat-num">{len(flags)}</span> flagged</div>')
+    body.append(f'  <div><span class="stat-num">{n_exclude}</span> exclude</div>')
+    body.append(f'  <div><span class="stat-num">{n_review}</span> review</div>')
+    body.append(f'</div>')
+
+    # Every flag on the page shares the theme, so its JSON is read once
+    # here and the render loop only does dict lookups
+    docs = load_theme_docs(theme)
+    rows = [render_flag_row(flag, docs) for flag in flags]
+    body.extend(rows)
+
+    write_page(
+        REVIEW_DIR / f'{theme}.html',
+        title=f'Review: {theme_label}',
+        subtitle=f'{len(flags)} documents flagged for review',
+        body_chunks=body,
+        breadcrumbs=[('Review Home', 'index.html'), (theme_label, '')]
+    )
+    return rows
 
 
 def main():
     REVIEW_DIR.mkdir(parents=True, exist_ok=True)
+    (REVIEW_DIR / 'review.css').write_text(PAGE_CSS, encoding='utf-8')
+    (REVIEW_DIR / 'review.js').write_text(PAGE_JS, encoding='utf-8')
 
     all_flags = load_all_flags()
     print(f"Loaded {len(all_flags)} flagged documents")
@@ -462,51 +557,45 @@ def main():
         print("No flags found. Make sure review agents have completed.")
         return
 
-    # Group by theme
-    by_theme = defaultdict(list)
+    # Group by theme and tally everything in one pass
+    # A theme's list and tally are created together the first time it is seen
+    by_theme = {}
+    by_criterion = {}
+    theme_tally = {}  # theme -> [n_exclude, n_review]
     for flag in all_flags:
-        by_theme[flag.get('theme', 'unknown')].append(flag)
+        theme = flag.theme
+        flags = by_theme.get(theme)
+        if flags is None:
+            flags = by_theme[theme] = []
+            theme_tally[theme] = [0, 0]
+        flags.append(flag)
+        by_criterion[flag.criterion] = by_criterion.get(flag.criterion, 0) + 1
+        rec = flag.recommendation
+        if rec == 'EXCLUDE':
+            theme_tally[theme][0] += 1
+        elif rec == 'REVIEW':
+            theme_tally[theme][1] += 1
 
     # Sort each theme's flags: EXCLUDE first, then REVIEW
     for theme in by_theme:
-        by_theme[theme].sort(key=lambda f: (0 if f.get('recommendation') == 'EXCLUDE' else 1, f.get('slug', '')))
+        by_theme[theme].sort(key=lambda f: (0 if f.recommendation == 'EXCLUDE' else 1, f.slug))
 
     # Count stats
-    total_exclude = sum(1 for f in all_flags if f.get('recommendation') == 'EXCLUDE')
-    total_review = sum(1 for f in all_flags if f.get('recommendation') == 'REVIEW')
-
-    # Criterion breakdown
-    by_criterion = defaultdict(int)
-    for f in all_flags:
-        by_criterion[f.get('criterion', 0)] += 1
+    total_exclude = sum(n_exclude for n_exclude, _ in theme_tally.values())
+    total_review = sum(n_review for _, n_review in theme_tally.values())
 
     # ── Generate per-theme pages ──
-    for theme in sorted(by_theme.keys()):
-        flags = by_theme[theme]
-        theme_label = THEME_NAMES.get(theme, theme)
-        n_exclude = sum(1 for f in flags if f.get('recommendation') == 'EXCLUDE')
-        n_review = sum(1 for f in flags if f.get('recommendation') == 'REVIEW')
-
-        body = []
-        body.append(f'<div class="stats-bar">')
-        body.append(f'  <div><span class="stat-num">{len(flags)}</span> flagged</div>')
-        body.append(f'  <div><span class="stat-num">{n_exclude}</span> exclude</div>')
-        body.append(f'  <div><span class="stat-num">{n_review}</span> review</div>')
-        body.append(f'</div>')
-
-        for flag in flags:
-            body.append(render_flag_row(flag))
-
-        html = render_page(
-            title=f'Review: {theme_label}',
-            subtitle=f'{len(flags)} documents flagged for review',
-            body_html='\n'.join(body),
-            breadcrumbs=[('Review Home', 'index.html'), (theme_label, '')]
-        )
-
-        out_path = REVIEW_DIR / f'{theme}.html'
-        out_path.write_text(html)
-        print(f"  {theme}.html: {len(flags)} flags ({n_exclude} exclude, {n_review} review)")
+    # Themes are independent; map() returns each theme's cards in order and
+    # they are reused in the master index below
+    themes = sorted(by_theme.keys())
+    rendered_rows = {}
+    with ProcessPoolExecutor(max_workers=min(8, len(themes))) as pool:
+        results = pool.map(write_theme_page, themes,
+                           [by_theme[t] for t in themes], [theme_tally[t] for t in themes])
+        for theme, rows in zip(themes, results):
+            rendered_rows[theme] = rows
+            n_exclude, n_review = theme_tally[theme]
+            print(f"  {theme}.html: {len(rows)} flags ({n_exclude} exclude, {n_review} review)")
 
     # ── Generate master index ──
     body = []
@@ -519,23 +608,19 @@ def main():
 
     # Criterion breakdown
     body.append(f'<h2>By Criterion</h2>')
-    body.append(f'<div class="stats-bar">')
-    for crit in sorted(by_criterion.keys()):
-        label = CRITERION_LABELS.get(crit, f'#{crit}')
-        body.append(f'  <div><span class="stat-num">{by_criterion[crit]}</span> {html_escape(label)}</div>')
-    body.append(f'</div>')
+    crit_items = '\n'.join(
+        f'  <div><span class="stat-num">{by_criterion[crit]}</span> {CRITERION_LABELS_HTML.get(crit, f"#{crit}")}</div>'
+        for crit in sorted(by_criterion))
+    body.append(f'<div class="stats-bar">\n{crit_items}\n</div>')
 
     # Table of contents
     body.append(f'<h2>By Theme</h2>')
-    body.append(f'<ul class="toc-list">')
-    for theme in sorted(by_theme.keys()):
-        flags = by_theme[theme]
-        theme_label = THEME_NAMES.get(theme, theme)
-        n_exclude = sum(1 for f in flags if f.get('recommendation') == 'EXCLUDE')
-        n_review = len(flags) - n_exclude
-        body.append(f'  <li><a href="{theme}.html">{html_escape(theme_label)}</a> '
-                     f'<span class="toc-count">({n_exclude}E / {n_review}R)</span></li>')
-    body.append(f'</ul>')
+    # Everything not excluded counts as R here, unlike the theme pages
+    toc_items = '\n'.join(
+        f'  <li><a href="{theme}.html">{html_escape(THEME_NAMES.get(theme, theme))}</a> '
+        f'<span class="toc-count">({theme_tally[theme][0]}E / {len(by_theme[theme]) - theme_tally[theme][0]}R)</span></li>'
+        for theme in themes)
+    body.append(f'<ul class="toc-list">\n{toc_items}\n</ul>')
 
     # All flags inline
     body.append(f'<h2>All Flagged Documents</h2>')
@@ -544,18 +629,16 @@ def main():
         theme_label = THEME_NAMES.get(theme, theme)
         body.append(f'<div class="theme-section">')
         body.append(f'  <h2>{html_escape(theme_label)} ({len(flags)})</h2>')
-        for flag in flags:
-            body.append(render_flag_row(flag))
+        body.extend(rendered_rows[theme])
         body.append(f'</div>')
 
-    html = render_page(
+    # body holds references to the cached cards; nothing is joined here
+    write_page(
+        REVIEW_DIR / 'index.html',
         title='Archive Content Review',
         subtitle=f'{len(all_flags)} documents flagged for potential exclusion',
-        body_html='\n'.join(body),
+        body_chunks=body,
     )
-
-    out_path = REVIEW_DIR / 'index.html'
-    out_path.write_text(html)
     print(f"\n  index.html: master review page")
     print(f"\nDone! Open review/index.html to review flagged documents.")
 
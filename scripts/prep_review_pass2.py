@@ -10,24 +10,42 @@ import json
 from pathlib import Path
 from collections import defaultdict
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to the stdlib parser and serializer
+    orjson = None
+
 REVIEW_DATA = Path(__file__).resolve().parent / 'review_data'
 
 # Theme doc counts: 01:31, 02:200, 03:223, 04:189, 05:1786, 06:143,
 #                   07:819, 08:16, 09:232, 10:99, 11:144
 
+
+def read_json(path):
+    """Parse a JSON file, using orjson when it is installed.
+
+    Both parsers take the raw bytes, so there is no separate text decode.
+    """
+    data = path.read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 def load_existing_flagged_slugs():
-    """Load all slugs already flagged in pass 1."""
+    """Load all slugs already flagged in pass 1.
+
+    Pass-1 files are numbered by chunk (flags_02.json, flags_05a.json, ...);
+    the glob leaves out pass 2's own flags_p2_*.json.
+    """
     flagged = set()
-    for p in REVIEW_DATA.glob('flags_*.json'):
-        if '_p2_' in p.name:
-            continue  # skip our own output
-        with open(p) as f:
-            try:
-                flags = json.load(f)
-                for flag in flags:
-                    flagged.add(flag.get('slug', ''))
-            except json.JSONDecodeError:
-                pass
+    for p in REVIEW_DATA.glob('flags_[0-9]*.json'):
+        try:
+            flags = read_json(p)
+            flagged.update(flag['slug'] for flag in flags if flag.get('slug'))
+        except json.JSONDecodeError:
+            pass
     return flagged
 
 
@@ -36,27 +54,34 @@ def load_theme_docs(theme_name):
     path = REVIEW_DATA / f'{theme_name}.json'
     if not path.exists():
         return []
-    with open(path) as f:
-        return json.load(f)
+    return read_json(path)
 
 
-def compact_doc(doc):
+def compact_doc(doc, theme):
     """Create compact version: slug, title, summary, short content preview."""
     return {
         'slug': doc['slug'],
         'title': doc.get('title', ''),
         'summary': doc.get('summary', ''),
         'content_preview': doc.get('content_preview', '')[:500],
-        'theme': '',  # filled in by caller
+        'theme': theme,
     }
 
 
 def write_chunk(name, docs, flagged_slugs):
     """Write a chunk file, filtering out already-flagged docs."""
+    # A plain comprehension: flagged_slugs is already a fast local, and
+    # itertools.compress over chained map() calls measured slower
     filtered = [d for d in docs if d['slug'] not in flagged_slugs]
+    # One compact record per line, as extract_for_review writes its JSON:
+    # no indent formatting, but still diffable a document at a time
     out_path = REVIEW_DATA / f'p2_input_{name}.json'
-    with open(out_path, 'w') as f:
-        json.dump(filtered, f, indent=1)
+    if orjson is not None:
+        records = b',\n'.join(map(orjson.dumps, filtered))
+        out_path.write_bytes(b'[\n' + records + b'\n]\n' if records else b'[]\n')
+    else:
+        records = ',\n'.join(map(json.dumps, filtered))
+        out_path.write_text(f'[\n{records}\n]\n' if records else '[]\n')
     print(f"  p2_input_{name}.json: {len(filtered)} docs ({len(docs) - len(filtered)} already flagged)")
     return len(filtered)
 
@@ -79,22 +104,16 @@ def main():
     }
 
     for chunk_id, theme in singles.items():
-        docs = load_theme_docs(theme)
-        for d in docs:
-            d = compact_doc(d)
-            d['theme'] = theme
-        compact = [dict(compact_doc(d), theme=theme) for d in docs]
+        compact = [compact_doc(d, theme) for d in load_theme_docs(theme)]
         total += write_chunk(chunk_id, compact, flagged)
 
     # Combined 01 + 08
-    docs_01 = [dict(compact_doc(d), theme='01-autobiography')
-               for d in load_theme_docs('01-autobiography')]
-    docs_08 = [dict(compact_doc(d), theme='08-correspondence')
-               for d in load_theme_docs('08-correspondence')]
+    docs_01 = [compact_doc(d, '01-autobiography') for d in load_theme_docs('01-autobiography')]
+    docs_08 = [compact_doc(d, '08-correspondence') for d in load_theme_docs('08-correspondence')]
     total += write_chunk('01_08', docs_01 + docs_08, flagged)
 
     # Theme 05 split 5 ways
-    docs_05 = [dict(compact_doc(d), theme='05-education-reform')
+    docs_05 = [compact_doc(d, '05-education-reform')
                for d in load_theme_docs('05-education-reform')]
     chunk_size = len(docs_05) // 5
     for i, label in enumerate(['05a', '05b', '05c', '05d', '05e']):
@@ -103,7 +122,7 @@ def main():
         total += write_chunk(label, docs_05[start:end], flagged)
 
     # Theme 07 split 2 ways
-    docs_07 = [dict(compact_doc(d), theme='07-professional-career')
+    docs_07 = [compact_doc(d, '07-professional-career')
                for d in load_theme_docs('07-professional-career')]
     mid = len(docs_07) // 2
     total += write_chunk('07a', docs_07[:mid], flagged)
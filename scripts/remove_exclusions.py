@@ -11,194 +11,291 @@ Finally runs an audit to verify removal.
 """
 
 import json
+import mmap
+import os
 import re
 import shutil
+import stat
 import sys
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from urllib.parse import unquote
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to the stdlib parser
+    orjson = None
+
 ARCHIVE_ROOT = Path(__file__).resolve().parent.parent
+SOURCE_LINK_TAIL = 16384  # bytes at the end of a reader page searched first for its download link
+
+_THEME_DIR_RE = re.compile(r'\d{2}-')
+_FILE_LINK_RE = re.compile(rb'<a\s+class="file-link-btn"\s+href="\.\./files/([^"]+)"')
+
+# Theme index pages, which are rewritten as bytes: every anchor is ASCII
+_STAT_NUM_RE = re.compile(rb'<span class="stat-num">(\d+)</span>')
+_DOC_STAT_RE = re.compile(rb'<span class="stat-num">(\d+)</span> documents')
+_FILTER_COUNT_RE = re.compile(rb'(<span class="filter-count" id="rowCount">)\d+ documents(</span>)')
+_HIGHLIGHT_LABEL_RE = re.compile(rb'(Show highlights only \()\d+(\))')
+
+# Root index page
+# A card's link runs up to its count line without crossing another <a> or
+# </a>; the run stops at the first '<' it may not take, so nothing backtracks
+_THEME_CARD_RE = re.compile(
+    r'(<a href="(\d{2}-[^/]+)/index\.html">(?:[^<]|<(?!/?a\b|div class="count">))*<div class="count">)'
+    r'(\d+) documents · (\d+) highlights(</div>)')
+_ROOT_STAT_RE = re.compile(r'(<span class="stat-num">)(\d+)(</span> documents archived)')
+_CARD_COUNT_RE = re.compile(r'<div class="count">(\d+) documents')
+
+
+def row_spans(html, tbody_start, tbody_end):
+    """Yield the (start, end) offsets of each <tr>...</tr> block in a page.
+
+    Only html[tbody_start:tbody_end] is scanned, without slicing it out.
+    """
+    start = html.find(b'<tr', tbody_start, tbody_end)
+    while start != -1:
+        # Skip tags that merely start with "tr"
+        if start + 3 >= tbody_end or html[start + 3:start + 4] not in (b'>', b' ', b'\t', b'\n', b'\r'):
+            start = html.find(b'<tr', start + 3, tbody_end)
+            continue
+        end = html.find(b'</tr>', start, tbody_end)
+        if end == -1:
+            return
+        end += len(b'</tr>')
+        yield start, end
+        start = html.find(b'<tr', end, tbody_end)
+
+
+def read_link_re(slugs):
+    """Compile one bytes pattern matching a theme index link to any of slugs."""
+    alternatives = b'|'.join(re.escape(slug.encode('utf-8')) for slug in slugs)
+    return re.compile(rb'href="read/(' + alternatives + rb')\.html"')
+
+
+def write_replace(path, data):
+    """Write bytes to path through a temporary file and os.replace.
+
+    An interrupted run leaves either the old page or the new one, never a
+    half-written file. The new page keeps the old one's permissions, and a
+    failed write (a full disk, say) removes the temporary file.
+    """
+    tmp = f'{path}.tmp'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+    try:
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+        os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    os.replace(tmp, path)
 
 
 def extract_source_filename(reader_path):
     """Extract the original source filename from a reader page's download link."""
     try:
-        html = reader_path.read_text(encoding='utf-8', errors='replace')
-        m = re.search(r'<a\s+class="file-link-btn"\s+href="\.\./files/([^"]+)"', html)
-        if m:
-            return unquote(m.group(1))
+        # Search the raw bytes via mmap and decode only the link; the page's
+        # tail is tried first so usually only its last pages are touched
+        with open(reader_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as html:
+            m = (_FILE_LINK_RE.search(html, max(0, len(html) - SOURCE_LINK_TAIL))
+                 or _FILE_LINK_RE.search(html))
+            if m:
+                return unquote(m.group(1).decode('utf-8', errors='replace'))
     except Exception:
         pass
     return None
 
 
 def remove_files(exclusions):
-    """Delete reader pages, image dirs, and source files. Returns removal stats."""
+    """Delete reader pages, image dirs, and source files. Returns removal stats.
+
+    Paths are plain strings and each file is unlinked straight away, with a
+    missing file reported from FileNotFoundError rather than a stat first.
+    """
     stats = {'reader': 0, 'images': 0, 'source': 0, 'source_missing': [], 'reader_missing': []}
+    root = str(ARCHIVE_ROOT)
 
     for entry in exclusions:
         slug = entry['slug']
         theme = entry['theme']
-        theme_dir = ARCHIVE_ROOT / theme
+        theme_dir = os.path.join(root, theme)
 
-        reader_path = theme_dir / 'read' / f'{slug}.html'
-        img_dir = theme_dir / 'read' / 'img' / slug
+        reader_path = os.path.join(theme_dir, 'read', f'{slug}.html')
+        img_dir = os.path.join(theme_dir, 'read', 'img', slug)
 
-        # Extract source filename before deleting reader page
-        source_filename = extract_source_filename(reader_path) if reader_path.exists() else None
+        # Extract source filename before deleting reader page (None if missing)
+        source_filename = extract_source_filename(reader_path)
 
-        if reader_path.exists():
-            reader_path.unlink()
+        try:
+            os.unlink(reader_path)
             stats['reader'] += 1
-        else:
+        except FileNotFoundError:
             stats['reader_missing'].append(f'{theme}/read/{slug}.html')
 
-        # Delete image directory
-        if img_dir.exists():
-            n_images = len(list(img_dir.iterdir()))
-            shutil.rmtree(img_dir)
-            stats['images'] += n_images
+        # Delete image directory, counting its entries in the same scandir
+        # pass; rmtree is only needed for the odd nested directory
+        try:
+            with os.scandir(img_dir) as images:
+                for image in images:
+                    if image.is_dir(follow_symlinks=False):
+                        shutil.rmtree(image.path)
+                    else:
+                        os.unlink(image.path)
+                    stats['images'] += 1
+            os.rmdir(img_dir)
+        except FileNotFoundError:
+            pass
 
         # Delete source file
         if source_filename:
-            source_path = theme_dir / 'files' / source_filename
-            if source_path.exists():
-                source_path.unlink()
+            try:
+                os.unlink(os.path.join(theme_dir, 'files', source_filename))
                 stats['source'] += 1
-            else:
+            except FileNotFoundError:
                 stats['source_missing'].append(f'{theme}/files/{source_filename}')
-        elif reader_path not in [None] and not reader_path.exists():
+        else:
             stats['source_missing'].append(f'{theme}/files/? (no reader page)')
 
     return stats
 
 
+def update_theme_index(theme, slugs):
+    """Remove one theme's excluded rows from its index page and update counts.
+
+    Returns (stats, message); stats is None if the page could not be updated.
+    """
+    index_path = ARCHIVE_ROOT / theme / 'index.html'
+    if not index_path.exists():
+        return None, f"  WARNING: {theme}/index.html not found"
+
+    # Raw bytes throughout: the page is never decoded or re-encoded
+    html = index_path.read_bytes()
+    link_re = read_link_re(slugs)
+
+    # Extract tbody content
+    tbody_start = html.find(b'<tbody>')
+    tbody_end = html.find(b'</tbody>')
+    if tbody_start == -1 or tbody_end == -1:
+        return None, f"  WARNING: no <tbody> in {theme}/index.html"
+
+    # Rows and the tail are zero-copy views into the page; only the short
+    # head is copied, to be rewritten
+    body_start = tbody_start + len(b'<tbody>')
+    page = memoryview(html)
+    before = html[:body_start]
+    after = page[tbody_end:]
+
+    # Filter out rows containing excluded slug links, searching each row in
+    # place by its offsets
+    kept_rows = []
+    removed = 0
+    removed_highlights = 0
+    remaining_highlights = 0
+    for start, end in row_spans(html, body_start, tbody_end):
+        highlight = html.find(b'data-highlight="true"', start, end) != -1
+        if link_re.search(html, start, end):
+            removed += 1
+            removed_highlights += highlight
+        else:
+            kept_rows.append(page[start:end])
+            remaining_highlights += highlight
+
+    remaining_rows = len(kept_rows)
+
+    # The stats bar and filter bar both sit above the table, so only
+    # `before` is rewritten; the page is joined back together once, below
+
+    # Update stats bar: first stat-num is doc count, second is highlights, third is files
+    # (left alone unless all three are there)
+    new_vals = iter([remaining_rows, remaining_highlights, remaining_rows])
+    new_before, n = _STAT_NUM_RE.subn(lambda m: b'<span class="stat-num">%d</span>' % next(new_vals),
+                                      before, count=3)
+    if n == 3:
+        before = new_before
+
+    # Update filter count
+    before = _FILTER_COUNT_RE.sub(rb'\g<1>%d documents\2' % remaining_rows, before)
+
+    # Update highlights filter label
+    before = _HIGHLIGHT_LABEL_RE.sub(rb'\g<1>%d\2' % remaining_highlights, before)
+
+    html = b''.join([before, b'\n', *kept_rows, b'\n', after])
+    write_replace(index_path, html)
+
+    # What the audit checks on the page as written: excluded slugs it still
+    # links to and the document count it shows
+    linked = {slug.decode('utf-8') for slug in link_re.findall(html)}
+    m = _DOC_STAT_RE.search(before)
+    stats = {
+        'removed': removed,
+        'removed_highlights': removed_highlights,
+        'remaining': remaining_rows,
+        'remaining_highlights': remaining_highlights,
+        'linked': linked,
+        'reported': int(m.group(1)) if m else None,
+    }
+    return stats, f"  {theme}/index.html: removed {removed} rows, {remaining_rows} remaining"
+
+
 def update_theme_indexes(exclusions_by_theme):
     """Remove table rows from theme index pages and update counts."""
     theme_stats = {}
 
-    for theme, slugs in exclusions_by_theme.items():
-        index_path = ARCHIVE_ROOT / theme / 'index.html'
-        if not index_path.exists():
-            print(f"  WARNING: {theme}/index.html not found")
-            continue
-
-        html = index_path.read_text(encoding='utf-8', errors='replace')
-        href_patterns = {f'href="read/{slug}.html"' for slug in slugs}
-
-        # Extract tbody content
-        tbody_start = html.find('<tbody>')
-        tbody_end = html.find('</tbody>')
-        if tbody_start == -1 or tbody_end == -1:
-            print(f"  WARNING: no <tbody> in {theme}/index.html")
-            continue
-
-        before = html[:tbody_start + len('<tbody>')]
-        tbody = html[tbody_start + len('<tbody>'):tbody_end]
-        after = html[tbody_end:]
-
-        # Split into individual <tr>...</tr> blocks
-        rows = re.findall(r'<tr(?:\s[^>]*)?>.*?</tr>', tbody, re.DOTALL)
-
-        # Filter out rows containing excluded slug links
-        kept_rows = []
-        removed = 0
-        removed_highlights = 0
-        for row in rows:
-            should_remove = any(hp in row for hp in href_patterns)
-            if should_remove:
-                removed += 1
-                if 'data-highlight="true"' in row:
-                    removed_highlights += 1
-            else:
-                kept_rows.append(row)
-
-        # Rebuild HTML
-        html = before + '\n' + ''.join(kept_rows) + '\n' + after
-
-        remaining_rows = len(kept_rows)
-        remaining_highlights = sum(1 for r in kept_rows if 'data-highlight="true"' in r)
-
-        # Update stats bar: first stat-num is doc count, second is highlights, third is files
-        stat_nums = list(re.finditer(r'<span class="stat-num">(\d+)</span>', html))
-        if len(stat_nums) >= 3:
-            for i, new_val in reversed(list(enumerate([
-                remaining_rows, remaining_highlights, remaining_rows,
-            ]))):
-                if i < len(stat_nums):
-                    m = stat_nums[i]
-                    html = html[:m.start()] + f'<span class="stat-num">{new_val}</span>' + html[m.end():]
-
-        # Update filter count
-        html = re.sub(
-            r'(<span class="filter-count" id="rowCount">)\d+ documents(</span>)',
-            rf'\g<1>{remaining_rows} documents\2',
-            html
-        )
-
-        # Update highlights filter label
-        html = re.sub(
-            r'(Show highlights only \()\d+(\))',
-            rf'\g<1>{remaining_highlights}\2',
-            html
-        )
-
-        index_path.write_text(html, encoding='utf-8')
-        theme_stats[theme] = {
-            'removed': removed,
-            'removed_highlights': removed_highlights,
-            'remaining': remaining_rows,
-            'remaining_highlights': remaining_highlights,
-        }
-        print(f"  {theme}/index.html: removed {removed} rows, {remaining_rows} remaining")
+    # Each theme's page is independent; map() keeps the report in order
+    themes = list(exclusions_by_theme)
+    with ProcessPoolExecutor(max_workers=min(8, len(themes) or 1)) as pool:
+        results = pool.map(update_theme_index, themes, [exclusions_by_theme[t] for t in themes])
+        for theme, (stats, message) in zip(themes, results):
+            print(message)
+            if stats is not None:
+                theme_stats[theme] = stats
 
     return theme_stats
 
 
 def update_root_index(theme_stats):
-    """Update document counts in root index.html."""
+    """Update document counts in root index.html and return the new page."""
     index_path = ARCHIVE_ROOT / 'index.html'
     html = index_path.read_text(encoding='utf-8', errors='replace')
 
     total_docs = sum(s['remaining'] for s in theme_stats.values())
     total_highlights = sum(s['remaining_highlights'] for s in theme_stats.values())
 
-    # For themes not in exclusions, add their existing counts from the HTML
-    for theme_card_match in re.finditer(
-        r'<a href="(\d{2}-[^/]+)/index\.html">.*?<div class="count">(\d+) documents · (\d+) highlights</div>',
-        html, re.DOTALL
-    ):
-        theme_name = theme_card_match.group(1)
-        if theme_name not in theme_stats:
-            total_docs += int(theme_card_match.group(2))
-            total_highlights += int(theme_card_match.group(3))
+    def update_card(m):
+        nonlocal total_docs, total_highlights
+        stats = theme_stats.get(m.group(2))
+        if stats is None:
+            # For themes not in exclusions, add their existing counts from the HTML
+            total_docs += int(m.group(3))
+            total_highlights += int(m.group(4))
+            return m.group(0)
+        return f'{m.group(1)}{stats["remaining"]} documents · {stats["remaining_highlights"]} highlights{m.group(5)}'
+
+    # Update each affected theme card count and total the rest in one pass
+    html = _THEME_CARD_RE.sub(update_card, html)
 
     # Update global stats bar
-    html = re.sub(
-        r'(<span class="stat-num">)\d+(</span> documents archived)',
-        rf'\g<1>{total_docs}\2',
-        html
-    )
-
-    # Update each affected theme card count
-    for theme, stats in theme_stats.items():
-        pattern = re.compile(
-            r'(<a href="' + re.escape(theme) + r'/index\.html">.*?<div class="count">)\d+ documents · \d+ highlights(</div>)',
-            re.DOTALL
-        )
-        html = pattern.sub(
-            rf'\g<1>{stats["remaining"]} documents · {stats["remaining_highlights"]} highlights\2',
-            html
-        )
-
-    index_path.write_text(html, encoding='utf-8')
+    html = _ROOT_STAT_RE.sub(rf'\g<1>{total_docs}\3', html)
+
+    write_replace(index_path, html.encode('utf-8'))
     print(f"\n  Root index.html: total now {total_docs} documents, {total_highlights} highlights")
-    return total_docs
+    return html
 
 
-def audit(exclusions, exclusions_by_theme):
-    """Verify all excluded content is actually gone."""
+def audit(exclusions, exclusions_by_theme, theme_stats, root_html):
+    """Verify all excluded content is actually gone.
+
+    theme_stats is update_theme_indexes' result and root_html the root page
+    update_root_index wrote; the pages they rewrote are checked from those
+    rather than read back from disk.
+    """
     print("\n── Audit ──")
     failures = 0
     checks = 0
@@ -218,18 +315,23 @@ def audit(exclusions, exclusions_by_theme):
 
     # 2. No excluded slugs referenced in theme indexes
     for theme, slugs in exclusions_by_theme.items():
-        index_path = ARCHIVE_ROOT / theme / 'index.html'
-        if not index_path.exists():
-            continue
-        html = index_path.read_text(encoding='utf-8', errors='replace')
+        if theme in theme_stats:
+            linked = theme_stats[theme]['linked']
+        else:
+            index_path = ARCHIVE_ROOT / theme / 'index.html'
+            if not index_path.exists():
+                continue
+            html = index_path.read_bytes()
+            linked = {slug.decode('utf-8') for slug in read_link_re(slugs).findall(html)}
         for slug in slugs:
             checks += 1
-            if f'href="read/{slug}.html"' in html:
+            if slug in linked:
                 print(f"  FAIL: {theme}/index.html still references {slug}")
                 failures += 1
 
     # 3. No excluded slugs referenced in root index
-    root_html = (ARCHIVE_ROOT / 'index.html').read_text()
+    # A substring test per slug: the root page is only a few KB, and
+    # compiling one alternation of every slug costs more than these scans
     for entry in exclusions:
         slug = entry['slug']
         if f'{slug}.html' in root_html:
@@ -237,38 +339,47 @@ def audit(exclusions, exclusions_by_theme):
             failures += 1
 
     # 4. Theme index stats match their own row counts
-    for theme_dir in sorted(ARCHIVE_ROOT.iterdir()):
-        if not (theme_dir.is_dir() and re.match(r'\d{2}-', theme_dir.name)):
-            continue
-        index_path = theme_dir / 'index.html'
-        if not index_path.exists():
-            continue
-        html = index_path.read_text()
-
-        # Count rows in tbody
-        tbody_start = html.find('<tbody>')
-        tbody_end = html.find('</tbody>')
-        if tbody_start == -1:
-            continue
-        tbody = html[tbody_start:tbody_end]
-        row_count = len(re.findall(r'<tr(?:\s[^>]*)?>.*?</tr>', tbody, re.DOTALL))
-
-        # Get reported stat
-        m = re.search(r'<span class="stat-num">(\d+)</span> documents', html)
-        if not m:
-            continue
-        reported = int(m.group(1))
+    # (scandir's entries answer is_dir() without another stat per name)
+    with os.scandir(ARCHIVE_ROOT) as entries:
+        theme_names = sorted(e.name for e in entries if _THEME_DIR_RE.match(e.name) and e.is_dir())
+    for theme in theme_names:
+        if theme in theme_stats:
+            row_count = theme_stats[theme]['remaining']
+            reported = theme_stats[theme]['reported']
+            if reported is None:
+                continue
+        else:
+            try:
+                with open(os.path.join(ARCHIVE_ROOT, theme, 'index.html'), 'rb') as f:
+                    html = f.read()
+            except FileNotFoundError:
+                continue
+
+            # Count rows in tbody
+            tbody_start = html.find(b'<tbody>')
+            tbody_end = html.find(b'</tbody>')
+            if tbody_start == -1:
+                continue
+            if tbody_end == -1:
+                tbody_end = len(html)
+            row_count = sum(1 for _ in row_spans(html, tbody_start, tbody_end))  # no copies needed
+
+            # Get reported stat
+            m = _DOC_STAT_RE.search(html)
+            if not m:
+                continue
+            reported = int(m.group(1))
         checks += 1
         if reported != row_count:
-            print(f"  FAIL: {theme_dir.name} stats say {reported} but has {row_count} table rows")
+            print(f"  FAIL: {theme} stats say {reported} but has {row_count} table rows")
             failures += 1
 
     # 5. Root total matches sum of theme card counts
     card_total = 0
-    for m in re.finditer(r'<div class="count">(\d+) documents', root_html):
+    for m in _CARD_COUNT_RE.finditer(root_html):
         card_total += int(m.group(1))
-    m = re.search(r'<span class="stat-num">(\d+)</span> documents archived', root_html)
-    root_total = int(m.group(1)) if m else -1
+    m = _ROOT_STAT_RE.search(root_html)
+    root_total = int(m.group(2)) if m else -1
     checks += 1
     if card_total != root_total:
         print(f"  FAIL: root total ({root_total}) != sum of theme cards ({card_total})")
@@ -295,15 +406,16 @@ def main():
         print(f"Error: {exclusions_path} not found")
         sys.exit(1)
 
-    with open(exclusions_path) as f:
-        exclusions = json.load(f)
+    data = exclusions_path.read_bytes()
+    exclusions = orjson.loads(data) if orjson is not None else json.loads(data)
 
     print(f"Loaded {len(exclusions)} exclusions from {exclusions_path}\n")
 
-    # Group by theme
-    exclusions_by_theme = defaultdict(list)
+    # Group by theme; each theme's dict is an ordered set of its slugs, so a
+    # slug listed twice is only matched and audited once
+    exclusions_by_theme = defaultdict(dict)
     for entry in exclusions:
-        exclusions_by_theme[entry['theme']].append(entry['slug'])
+        exclusions_by_theme[entry['theme']][entry['slug']] = None
 
     # Step 1: Delete files
     print("── Deleting files ──")
@@ -320,10 +432,10 @@ def main():
 
     # Step 3: Update root index
     print("\n── Updating root index ──")
-    update_root_index(theme_stats)
+    root_html = update_root_index(theme_stats)
 
     # Step 4: Audit
-    audit(exclusions, exclusions_by_theme)
+    audit(exclusions, exclusions_by_theme, theme_stats, root_html)
 
 
 if __name__ == '__main__':